@@ -1,111 +1,229 @@
 # Dashboard de Seguimiento de Proyectos por Procesos y Subprocesos - VERSIÓN CORREGIDA
 
+import functools
+import os
+import tempfile
+import threading
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from datetime import datetime
 
+import archivado
+import datos
+import exportacion
+import importacion
+import instrumentacion
+from datos import crear_engine, inicializar_esquema
+
 st.set_page_config(page_title="Gestor de Proyectos", layout="wide")
 st.title("📊 Dashboard de Seguimiento de Proyectos")
 
 # Inicializar la base de datos
 @st.cache_resource
 def init_database():
-    engine = create_engine("sqlite:///seguimiento.db")
-    
-    # Crear tablas con estructura corregida
-    with engine.begin() as conn:
-        conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS procesos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT UNIQUE,
-            fecha_creacion TEXT
-        );
-        """))
-        conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS subprocesos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT,
-            proceso_id INTEGER,
-            fecha_creacion TEXT,
-            FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE
-        );
-        """))
-        conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS proyectos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT,
-            responsable TEXT,
-            estado TEXT DEFAULT 'Pendiente',
-            proceso_id INTEGER,
-            subproceso_id INTEGER,
-            fecha_creacion TEXT,
-            fecha_proyeccion TEXT,
-            fecha_finalizacion TEXT,
-            FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE,
-            FOREIGN KEY (subproceso_id) REFERENCES subprocesos(id) ON DELETE CASCADE
-        );
-        """))
-        conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS tareas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            proyecto_id INTEGER,
-            descripcion TEXT,
-            responsable TEXT,
-            fecha_inicio TEXT,
-            fecha_fin TEXT,
-            estado TEXT DEFAULT 'Pendiente',
-            fecha_creacion TEXT,
-            fecha_proyeccion TEXT,
-            fecha_cumplimiento TEXT,
-            FOREIGN KEY (proyecto_id) REFERENCES proyectos(id) ON DELETE CASCADE
-        );
-        """))
-    
+    engine = crear_engine()
+    instrumentacion.instrumentar_engine(engine)
+    inicializar_esquema(engine)
     return engine
 
 engine = init_database()
 
-# Función para cargar datos desde la base de datos
-def cargar_datos():
-    try:
-        procesos = pd.read_sql("SELECT * FROM procesos ORDER BY fecha_creacion DESC", engine)
-        subprocesos = pd.read_sql("SELECT * FROM subprocesos ORDER BY fecha_creacion DESC", engine)
-        proyectos = pd.read_sql("SELECT * FROM proyectos ORDER BY fecha_creacion DESC", engine)
-        tareas = pd.read_sql("SELECT * FROM tareas ORDER BY fecha_creacion DESC", engine)
-        return procesos, subprocesos, proyectos, tareas
-    except Exception as e:
-        st.error(f"Error al cargar datos: {e}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-
-# Función para actualizar datos y limpiar cache
-def actualizar_datos():
-    st.cache_data.clear()
-    return cargar_datos()
-
-# Inicializar estado de sesión
-if 'proceso_seleccionado' not in st.session_state:
-    st.session_state.proceso_seleccionado = ""
-if 'subproceso_seleccionado' not in st.session_state:
-    st.session_state.subproceso_seleccionado = ""
-if 'proyecto_seleccionado' not in st.session_state:
-    st.session_state.proyecto_seleccionado = ""
+# Modo depuración (casilla al final de la barra lateral): mide consultas y secciones de esta ejecución
+depuracion = st.session_state.get("modo_depuracion", False)
+if depuracion:
+    instrumentacion.iniciar("página", "inicio")
+
+# Mediciones de la sesión: las últimas HISTORIAL_MEDICIONES, y también al archivo de métricas si existe
+HISTORIAL_MEDICIONES = 50
+
+def guardar_medicion(medicion):
+    historial = st.session_state.setdefault("mediciones", [])
+    historial.append(medicion)
+    del historial[:-HISTORIAL_MEDICIONES]
+    instrumentacion.guardar(medicion)
+
+# Sección medida para los fragmentos: dentro de la página completa es una sección más; cuando el
+# fragmento se ejecuta solo, es una medición propia
+def medir_fragmento(nombre):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if instrumentacion.activa() is not None:
+                with instrumentacion.seccion(nombre):
+                    return funcion(*args, **kwargs)
+            if not st.session_state.get("modo_depuracion", False):
+                return funcion(*args, **kwargs)
+            instrumentacion.iniciar(f"fragmento {nombre}")
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                guardar_medicion(instrumentacion.terminar())
+        return envoltura
+    return decorador
+
+# Revisión actual de los datos (una sola fila, lectura inmediata)
+def obtener_revision():
+    return datos.obtener_revision(engine)
+
+# Instantánea en memoria de procesos, subprocesos, proyectos y tareas, compartida por todas las
+# sesiones del proceso. Cada ejecución la pone al día con el registro de cambios (tras una escritura
+# solo se leen las filas cambiadas y se rehacen los nodos afectados de su índice de la jerarquía); una
+# instantánea nunca se modifica, la puesta al día crea otra, así que las sesiones solo se quedan con
+# filtros de la que leyeron y la memoria no crece con los usuarios.
+@st.cache_resource
+def instantanea_compartida():
+    return {"instantanea": None, "cerrojo": threading.Lock()}
+
+def obtener_instantanea():
+    compartida = instantanea_compartida()
+    with compartida["cerrojo"]:
+        compartida["instantanea"] = datos.actualizar_instantanea(engine, compartida["instantanea"])
+        return compartida["instantanea"]
+
+# Memoria de la instantánea por tabla (MiB), calculada una vez por secuencia del registro de cambios
+@st.cache_data(show_spinner=False, max_entries=1)
+def memoria_instantanea(_instantanea, secuencia):
+    return {tabla: tamano / 2**20 for tabla, tamano in datos.memoria_instantanea(_instantanea).items()}
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cargar_cronograma(proyecto_id, agrupacion, desde, hasta, revision):
+    return datos.cargar_cronograma(engine, proyecto_id, agrupacion, desde, hasta)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def buscar(consulta, revision):
+    return datos.buscar(engine, consulta)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cargar_pagina(tabla, orden, descendente, tamano, cursor, padre_id, revision):
+    return datos.cargar_pagina(engine, tabla, orden, descendente, tamano, cursor, padre_id)
+
+# Resumen por proyecto y totales globales leídos de los contadores mantenidos por triggers
+@st.cache_data(show_spinner=False, max_entries=1)
+def cargar_resumen(revision):
+    return datos.cargar_resumen(engine)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def cargar_contadores(revision):
+    return datos.cargar_contadores(engine)
+
+# Indicadores de la cartera agregados en SQL; el día forma parte de la clave porque las tareas
+# vencidas cambian con la fecha aunque los datos no cambien
+@st.cache_data(show_spinner=False, max_entries=8)
+def cargar_cartera(nivel, hoy, revision):
+    return datos.cargar_cartera(engine, nivel, hoy)
+
+# Archivo de exportación de la jerarquía completa, generado por bloques en disco y compartido
+# entre sesiones hasta la siguiente escritura. La caché guarda solo el directorio temporal (se borra
+# al salir de la caché), no el contenido: cada descarga lee el archivo desde disco.
+@st.cache_resource(show_spinner="Generando exportación...", max_entries=2)
+def generar_exportacion(formato, revision):
+    directorio = tempfile.TemporaryDirectory(prefix="seguimiento_exportacion_")
+    with open(os.path.join(directorio.name, f"seguimiento.{formato}"), "wb") as archivo:
+        exportacion.exportar(engine, archivo, formato)
+    return directorio
+
+# Base de archivo (proyectos finalizados antiguos), consultada solo desde la sección Archivo. Se
+# escribe únicamente al archivar, que cambia la revisión de la base principal.
+@st.cache_resource
+def engine_archivo():
+    engine_frio = archivado.abrir_archivo(archivado.ruta_archivo(engine))
+    instrumentacion.instrumentar_engine(engine_frio)
+    return engine_frio
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cargar_archivo(texto, revision):
+    return archivado.cargar_totales(engine_archivo()), archivado.cargar_proyectos(engine_archivo(), texto)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cargar_tareas_archivadas(proyecto_id, revision):
+    return archivado.cargar_tareas(engine_archivo(), proyecto_id)
+
+# Opciones de orden de las listas de la barra lateral: etiqueta -> (columna, descendente)
+ORDEN_LISTAS = {
+    "Más recientes": ("fecha_creacion", True),
+    "Más antiguos": ("fecha_creacion", False),
+    "Nombre (A-Z)": ("nombre", False),
+    "Nombre (Z-A)": ("nombre", True),
+}
+
+# Intervalo de actualización de las secciones de resumen y estadísticas (fragmentos)
+REFRESCO_RESUMEN = "30s"
+
+# Niveles de agrupación de la salud de la cartera: etiqueta -> nivel de datos.cargar_cartera
+NIVELES_CARTERA = {"Proceso": "proceso", "Subproceso": "subproceso", "Proyecto": "proyecto", "Responsable": "responsable"}
+
+# Cronograma: a partir de este número de tareas se agrupan las barras (modo de proyecto grande)
+UMBRAL_CRONOGRAMA = 200
+AGRUPAR_CRONOGRAMA = {"Responsable": "responsable", "Semana de inicio": "semana"}
+
+# Lista paginada por keyset: selector de orden y tamaño, y navegación entre páginas. La sesión solo
+# guarda la pila de cursores de inicio de cada página visitada; se reinicia al cambiar orden o filtro.
+# Los botones cambian la pila en su callback, así que dentro de un fragmento solo se repite el fragmento.
+def lista_paginada(contenedor, clave, tabla, opciones_orden, revision, padre_id=None, tamanos=(10, 25, 50, 100)):
+    col_orden, col_tamano = contenedor.columns([2, 1])
+    orden, descendente = opciones_orden[col_orden.selectbox("Ordenar por", list(opciones_orden), key=f"orden_{clave}")]
+    tamano = col_tamano.selectbox("Por página", tamanos, key=f"tamano_{clave}")
+    
+    firma = (orden, descendente, tamano, padre_id)
+    paginacion = st.session_state.get(f"paginacion_{clave}")
+    if paginacion is None or paginacion["firma"] != firma:
+        paginacion = {"firma": firma, "cursores": [None]}
+        st.session_state[f"paginacion_{clave}"] = paginacion
+    cursores = paginacion["cursores"]
+    
+    pagina, siguiente = cargar_pagina(tabla, orden, descendente, tamano, cursores[-1], padre_id, revision)
+    
+    col_anterior, col_numero, col_siguiente = contenedor.columns([1, 1, 1])
+    col_anterior.button("◀", key=f"anterior_{clave}", disabled=len(cursores) == 1, on_click=cursores.pop)
+    col_numero.caption(f"Página {len(cursores)}")
+    col_siguiente.button("▶", key=f"siguiente_{clave}", disabled=siguiente is None,
+                         on_click=cursores.append, args=(siguiente,))
+    return pagina
+
+# Elementos existentes de una tabla en la barra lateral, como fragmento: ordenar o cambiar de página
+# no vuelve a ejecutar el resto del script
+@st.fragment
+@medir_fragmento("listas")
+def lista_existentes(tabla, padre_id=None, detalle=None):
+    pagina = lista_paginada(st, tabla, tabla, ORDEN_LISTAS, obtener_revision(), padre_id)
+    if detalle:
+        st.markdown("\n".join(f"- {nombre} ({extra})" for nombre, extra in zip(pagina['nombre'], pagina[detalle])))
+    else:
+        st.markdown("\n".join(f"- {nombre}" for nombre in pagina['nombre']))
+
+# Inicializar estado de sesión: la selección se guarda por id (None = sin selección)
+for clave in ('proceso_id', 'subproceso_id', 'proyecto_id'):
+    if clave not in st.session_state:
+        st.session_state[clave] = None
 
 # Cargar datos
-procesos, subprocesos, proyectos, tareas = cargar_datos()
+revision = obtener_revision()
+try:
+    instantanea = obtener_instantanea()
+    indice = instantanea["indice"]
+except Exception as e:
+    st.error(f"Error al cargar datos: {e}")
+    indice = datos.indice_vacio()
+ids_procesos = datos.hijos(indice, "procesos").tolist()
+
+# Opciones de un selector de la barra lateral: ids, con el nombre del índice como etiqueta
+def formato_nodo(tabla, vacio):
+    return lambda id_: vacio if id_ is None else datos.nombre_nodo(indice, tabla, id_)
 
 # Sidebar para gestión jerárquica
+instrumentacion.marcar("barra lateral")
 st.sidebar.header("🧩 Gestión Jerárquica")
 
 # ============= GESTIÓN DE PROCESOS =============
 st.sidebar.subheader("1️⃣ Procesos")
 
 # Mostrar procesos existentes
-if not procesos.empty:
-    st.sidebar.write("**Procesos existentes:**")
-    for _, proceso in procesos.iterrows():
-        st.sidebar.write(f"• {proceso['nombre']}")
+if ids_procesos:
+    with st.sidebar.expander(f"**Procesos existentes ({len(ids_procesos)})**"):
+        lista_existentes("procesos")
 
 # Crear nuevo proceso
 with st.sidebar.expander("➕ Crear Nuevo Proceso"):
@@ -115,7 +233,7 @@ with st.sidebar.expander("➕ Crear Nuevo Proceso"):
             try:
                 with engine.begin() as conn:
                     conn.execute(text("INSERT INTO procesos (nombre, fecha_creacion) VALUES (:n, :f)"), 
-                                {"n": nuevo_proceso.strip(), "f": datetime.now().isoformat()})
+                                {"n": nuevo_proceso.strip(), "f": datos.ahora()})
                 st.success(f"✅ Proceso '{nuevo_proceso}' creado exitosamente")
                 st.rerun()
             except Exception as e:
@@ -124,34 +242,27 @@ with st.sidebar.expander("➕ Crear Nuevo Proceso"):
             st.warning("⚠️ Ingrese un nombre válido para el proceso")
 
 # Seleccionar proceso
-opciones_procesos = ["Seleccionar proceso..."] + (procesos['nombre'].tolist() if not procesos.empty else [])
-proceso_seleccionado = st.sidebar.selectbox(
+st.session_state.proceso_id = st.sidebar.selectbox(
     "Seleccionar Proceso", 
-    opciones_procesos, 
-    key="select_proceso",
-    index=0
+    [None] + ids_procesos, 
+    format_func=formato_nodo("procesos", "Seleccionar proceso..."),
+    key="select_proceso"
 )
-
-# Actualizar estado de sesión
-if proceso_seleccionado != "Seleccionar proceso...":
-    st.session_state.proceso_seleccionado = proceso_seleccionado
-else:
-    st.session_state.proceso_seleccionado = ""
+proc_id = st.session_state.proceso_id
 
 # Eliminar proceso
-if st.session_state.proceso_seleccionado:
+if proc_id is not None:
     with st.sidebar.expander("🗑️ Eliminar Proceso"):
-        st.warning(f"¿Eliminar '{st.session_state.proceso_seleccionado}'?")
+        st.warning(f"¿Eliminar '{datos.nombre_nodo(indice, 'procesos', proc_id)}'?")
         st.write("⚠️ Esto eliminará todos los subprocesos, proyectos y tareas asociados")
         if st.button("Confirmar Eliminación", key="btn_eliminar_proceso"):
             try:
                 with engine.begin() as conn:
-                    pid = procesos[procesos['nombre'] == st.session_state.proceso_seleccionado]['id'].values[0]
-                    conn.execute(text("DELETE FROM procesos WHERE id = :pid"), {"pid": pid})
-                st.success(f"✅ Proceso '{st.session_state.proceso_seleccionado}' eliminado")
-                st.session_state.proceso_seleccionado = ""
-                st.session_state.subproceso_seleccionado = ""
-                st.session_state.proyecto_seleccionado = ""
+                    conn.execute(text("DELETE FROM procesos WHERE id = :pid"), {"pid": proc_id})
+                st.success(f"✅ Proceso '{datos.nombre_nodo(indice, 'procesos', proc_id)}' eliminado")
+                st.session_state.proceso_id = None
+                st.session_state.subproceso_id = None
+                st.session_state.proyecto_id = None
                 st.rerun()
             except Exception as e:
                 st.error(f"❌ Error al eliminar proceso: {e}")
@@ -159,18 +270,16 @@ if st.session_state.proceso_seleccionado:
 # ============= GESTIÓN DE SUBPROCESOS =============
 st.sidebar.subheader("2️⃣ Subprocesos")
 
-if st.session_state.proceso_seleccionado:
-    st.sidebar.info(f"📋 Proceso: {st.session_state.proceso_seleccionado}")
+if proc_id is not None:
+    st.sidebar.info(f"📋 Proceso: {datos.nombre_nodo(indice, 'procesos', proc_id)}")
     
     # Obtener subprocesos del proceso seleccionado
-    proc_id = procesos[procesos['nombre'] == st.session_state.proceso_seleccionado]['id'].values[0]
-    subproc_df = subprocesos[subprocesos['proceso_id'] == proc_id]
+    ids_subprocesos = datos.hijos(indice, "subprocesos", proc_id).tolist()
     
     # Mostrar subprocesos existentes
-    if not subproc_df.empty:
-        st.sidebar.write("**Subprocesos existentes:**")
-        for _, subproceso in subproc_df.iterrows():
-            st.sidebar.write(f"• {subproceso['nombre']}")
+    if ids_subprocesos:
+        with st.sidebar.expander(f"**Subprocesos existentes ({len(ids_subprocesos)})**"):
+            lista_existentes("subprocesos", proc_id)
     
     # Crear nuevo subproceso
     with st.sidebar.expander("➕ Crear Nuevo Subproceso"):
@@ -180,7 +289,7 @@ if st.session_state.proceso_seleccionado:
                 try:
                     with engine.begin() as conn:
                         conn.execute(text("INSERT INTO subprocesos (nombre, proceso_id, fecha_creacion) VALUES (:n, :pid, :f)"), 
-                                    {"n": nuevo_subproceso.strip(), "pid": proc_id, "f": datetime.now().isoformat()})
+                                    {"n": nuevo_subproceso.strip(), "pid": proc_id, "f": datos.ahora()})
                     st.success(f"✅ Subproceso '{nuevo_subproceso}' creado exitosamente")
                     st.rerun()
                 except Exception as e:
@@ -189,56 +298,48 @@ if st.session_state.proceso_seleccionado:
                 st.warning("⚠️ Ingrese un nombre válido para el subproceso")
     
     # Seleccionar subproceso
-    opciones_subprocesos = ["Seleccionar subproceso..."] + (subproc_df['nombre'].tolist() if not subproc_df.empty else [])
-    subproceso_seleccionado = st.sidebar.selectbox(
+    st.session_state.subproceso_id = st.sidebar.selectbox(
         "Seleccionar Subproceso", 
-        opciones_subprocesos, 
-        key="select_subproceso",
-        index=0
+        [None] + ids_subprocesos, 
+        format_func=formato_nodo("subprocesos", "Seleccionar subproceso..."),
+        key="select_subproceso"
     )
-    
-    # Actualizar estado de sesión
-    if subproceso_seleccionado != "Seleccionar subproceso...":
-        st.session_state.subproceso_seleccionado = subproceso_seleccionado
-    else:
-        st.session_state.subproceso_seleccionado = ""
+    spid = st.session_state.subproceso_id
     
     # Eliminar subproceso
-    if st.session_state.subproceso_seleccionado:
+    if spid is not None:
         with st.sidebar.expander("🗑️ Eliminar Subproceso"):
-            st.warning(f"¿Eliminar '{st.session_state.subproceso_seleccionado}'?")
+            st.warning(f"¿Eliminar '{datos.nombre_nodo(indice, 'subprocesos', spid)}'?")
             st.write("⚠️ Esto eliminará todos los proyectos y tareas asociados")
             if st.button("Confirmar Eliminación", key="btn_eliminar_subproceso"):
                 try:
                     with engine.begin() as conn:
-                        spid = subproc_df[subproc_df['nombre'] == st.session_state.subproceso_seleccionado]['id'].values[0]
                         conn.execute(text("DELETE FROM subprocesos WHERE id = :spid"), {"spid": spid})
-                    st.success(f"✅ Subproceso '{st.session_state.subproceso_seleccionado}' eliminado")
-                    st.session_state.subproceso_seleccionado = ""
-                    st.session_state.proyecto_seleccionado = ""
+                    st.success(f"✅ Subproceso '{datos.nombre_nodo(indice, 'subprocesos', spid)}' eliminado")
+                    st.session_state.subproceso_id = None
+                    st.session_state.proyecto_id = None
                     st.rerun()
                 except Exception as e:
                     st.error(f"❌ Error al eliminar subproceso: {e}")
 
 else:
+    st.session_state.subproceso_id = None
     st.sidebar.info("ℹ️ Seleccione un proceso para gestionar subprocesos")
 
 # ============= GESTIÓN DE PROYECTOS =============
 st.sidebar.subheader("3️⃣ Proyectos")
 
-if st.session_state.proceso_seleccionado and st.session_state.subproceso_seleccionado:
-    st.sidebar.info(f"📋 Proceso: {st.session_state.proceso_seleccionado}")
-    st.sidebar.info(f"🔹 Subproceso: {st.session_state.subproceso_seleccionado}")
+if proc_id is not None and st.session_state.subproceso_id is not None:
+    st.sidebar.info(f"📋 Proceso: {datos.nombre_nodo(indice, 'procesos', proc_id)}")
+    st.sidebar.info(f"🔹 Subproceso: {datos.nombre_nodo(indice, 'subprocesos', spid)}")
     
     # Obtener proyectos del subproceso seleccionado
-    spid = subproc_df[subproc_df['nombre'] == st.session_state.subproceso_seleccionado]['id'].values[0]
-    proy_df = proyectos[proyectos['subproceso_id'] == spid]
+    ids_proyectos = datos.hijos(indice, "proyectos", spid).tolist()
     
     # Mostrar proyectos existentes
-    if not proy_df.empty:
-        st.sidebar.write("**Proyectos existentes:**")
-        for _, proyecto in proy_df.iterrows():
-            st.sidebar.write(f"• {proyecto['nombre']} ({proyecto['estado']})")
+    if ids_proyectos:
+        with st.sidebar.expander(f"**Proyectos existentes ({len(ids_proyectos)})**"):
+            lista_existentes("proyectos", spid, detalle='estado')
     
     # Crear nuevo proyecto
     with st.sidebar.expander("➕ Crear Nuevo Proyecto"):
@@ -255,7 +356,7 @@ if st.session_state.proceso_seleccionado and st.session_state.subproceso_selecci
                             VALUES (:n, :r, 'Pendiente', :pid, :spid, :f, :p)"""),
                             {"n": nombre_proyecto.strip(), "r": responsable_proyecto.strip(), 
                              "pid": proc_id, "spid": spid, 
-                             "f": datetime.now().isoformat(), "p": fecha_proyeccion.isoformat()})
+                             "f": datos.ahora(), "p": datos.a_dias(fecha_proyeccion)})
                     st.success(f"✅ Proyecto '{nombre_proyecto}' creado exitosamente")
                     st.rerun()
                 except Exception as e:
@@ -264,44 +365,38 @@ if st.session_state.proceso_seleccionado and st.session_state.subproceso_selecci
                 st.warning("⚠️ Ingrese un nombre válido para el proyecto")
     
     # Seleccionar proyecto
-    opciones_proyectos = ["Seleccionar proyecto..."] + (proy_df['nombre'].tolist() if not proy_df.empty else [])
-    proyecto_seleccionado = st.sidebar.selectbox(
+    st.session_state.proyecto_id = st.sidebar.selectbox(
         "Seleccionar Proyecto", 
-        opciones_proyectos, 
-        key="select_proyecto",
-        index=0
+        [None] + ids_proyectos, 
+        format_func=formato_nodo("proyectos", "Seleccionar proyecto..."),
+        key="select_proyecto"
     )
-    
-    # Actualizar estado de sesión
-    if proyecto_seleccionado != "Seleccionar proyecto...":
-        st.session_state.proyecto_seleccionado = proyecto_seleccionado
-    else:
-        st.session_state.proyecto_seleccionado = ""
+    prid = st.session_state.proyecto_id
     
     # Eliminar proyecto
-    if st.session_state.proyecto_seleccionado:
+    if prid is not None:
         with st.sidebar.expander("🗑️ Eliminar Proyecto"):
-            st.warning(f"¿Eliminar '{st.session_state.proyecto_seleccionado}'?")
+            st.warning(f"¿Eliminar '{datos.nombre_nodo(indice, 'proyectos', prid)}'?")
             st.write("⚠️ Esto eliminará todas las tareas asociadas")
             if st.button("Confirmar Eliminación", key="btn_eliminar_proyecto"):
                 try:
                     with engine.begin() as conn:
-                        prid = proy_df[proy_df['nombre'] == st.session_state.proyecto_seleccionado]['id'].values[0]
                         conn.execute(text("DELETE FROM proyectos WHERE id = :prid"), {"prid": prid})
-                    st.success(f"✅ Proyecto '{st.session_state.proyecto_seleccionado}' eliminado")
-                    st.session_state.proyecto_seleccionado = ""
+                    st.success(f"✅ Proyecto '{datos.nombre_nodo(indice, 'proyectos', prid)}' eliminado")
+                    st.session_state.proyecto_id = None
                     st.rerun()
                 except Exception as e:
                     st.error(f"❌ Error al eliminar proyecto: {e}")
 
 else:
+    st.session_state.proyecto_id = None
     st.sidebar.info("ℹ️ Seleccione un proceso y subproceso para gestionar proyectos")
 
 # ============= GESTIÓN DE TAREAS =============
 st.sidebar.subheader("4️⃣ Tareas")
 
-if st.session_state.proyecto_seleccionado:
-    st.sidebar.info(f"🎯 Proyecto: {st.session_state.proyecto_seleccionado}")
+if st.session_state.proyecto_id is not None:
+    st.sidebar.info(f"🎯 Proyecto: {datos.nombre_nodo(indice, 'proyectos', prid)}")
     
     # Crear nueva tarea
     with st.sidebar.expander("➕ Crear Nueva Tarea"):
@@ -314,14 +409,13 @@ if st.session_state.proyecto_seleccionado:
         if st.button("Crear Tarea", key="btn_crear_tarea"):
             if descripcion_tarea.strip():
                 try:
-                    prid = proy_df[proy_df['nombre'] == st.session_state.proyecto_seleccionado]['id'].values[0]
                     with engine.begin() as conn:
                         conn.execute(text("""
                             INSERT INTO tareas (proyecto_id, descripcion, responsable, fecha_inicio, fecha_fin, estado, fecha_creacion, fecha_proyeccion)
                             VALUES (:pid, :d, :r, :i, :f, 'Pendiente', :fc, :fp)"""),
                             {"pid": prid, "d": descripcion_tarea.strip(), "r": responsable_tarea.strip(), 
-                             "i": fecha_inicio.isoformat(), "f": fecha_fin.isoformat(), 
-                             "fc": datetime.now().isoformat(), "fp": fecha_proyeccion_tarea.isoformat()})
+                             "i": datos.a_dias(fecha_inicio), "f": datos.a_dias(fecha_fin), 
+                             "fc": datos.ahora(), "fp": datos.a_dias(fecha_proyeccion_tarea)})
                     st.success("✅ Tarea creada exitosamente")
                     st.rerun()
                 except Exception as e:
@@ -331,49 +425,188 @@ if st.session_state.proyecto_seleccionado:
 else:
     st.sidebar.info("ℹ️ Seleccione un proyecto para gestionar tareas")
 
+# ============= IMPORTACIÓN MASIVA =============
+with st.sidebar.expander("📥 Importación Masiva (CSV / Excel)"):
+    st.caption("Columnas: proceso, subproceso, proyecto y opcionalmente " + ", ".join(importacion.COLUMNAS_OPCIONALES)
+               + ". Los procesos, subprocesos y proyectos que no existan se crean.")
+    
+    # Informe de la última importación (se muestra tras la recarga)
+    informe = st.session_state.pop("informe_importacion", None)
+    if informe:
+        creados = informe["creados"]
+        st.success(f"✅ {informe['filas']} filas en {informe['segundos']:.1f} s "
+                   f"({informe['filas_por_segundo']:.0f} filas/s): {creados['tareas']} tareas, "
+                   f"{creados['proyectos']} proyectos, {creados['subprocesos']} subprocesos, {creados['procesos']} procesos")
+        if informe["rechazadas"]:
+            st.warning(f"⚠️ {len(informe['rechazadas'])} filas rechazadas")
+            st.dataframe(pd.DataFrame(informe["rechazadas"]), use_container_width=True, hide_index=True)
+    
+    archivo_importacion = st.file_uploader("Archivo", type=["csv", "xlsx"], key="archivo_importacion")
+    if st.button("Importar", key="btn_importar", disabled=archivo_importacion is None):
+        try:
+            with st.spinner("Importando..."):
+                st.session_state.informe_importacion = importacion.importar(engine, archivo_importacion)
+            st.rerun()
+        except Exception as e:
+            st.error(f"❌ Error al importar: {e}")
+
+# ============= EXPORTACIÓN =============
+# Tras la descarga se oculta el botón: la sesión deja de retener el archivo servido
+def descartar_exportacion():
+    st.session_state.pop("exportacion_preparada", None)
+
+# Fragmento: elegir formato y preparar la descarga no recarga la página. La exportación preparada
+# guarda la revisión del momento del clic: las escrituras posteriores no la regeneran en cada
+# ejecución, solo un nuevo clic en Preparar.
+@st.fragment
+@medir_fragmento("exportación")
+def seccion_exportacion():
+    formato_exportacion = st.radio("Formato", ["CSV", "Parquet"], horizontal=True, key="formato_exportacion")
+    formato = formato_exportacion.lower()
+    if st.button("Preparar Exportación", key="btn_exportar"):
+        st.session_state.exportacion_preparada = (formato, obtener_revision())
+    preparada = st.session_state.get("exportacion_preparada")
+    if preparada is not None and preparada[0] == formato:
+        try:
+            directorio = generar_exportacion(*preparada)
+            with open(os.path.join(directorio.name, f"seguimiento.{formato}"), "rb") as archivo:
+                st.download_button(
+                    f"⬇️ Descargar {formato_exportacion}",
+                    archivo,
+                    file_name=f"seguimiento_{datetime.now():%Y%m%d}.{formato}",
+                    mime=exportacion.FORMATOS[formato],
+                    key="btn_descargar_exportacion",
+                    on_click=descartar_exportacion
+                )
+        except Exception as e:
+            st.error(f"❌ Error al exportar: {e}")
+
+with st.sidebar.expander("📤 Exportar Datos"):
+    seccion_exportacion()
+
+# ============= BÚSQUEDA =============
+# Saltar al proyecto de un resultado (por id): se ejecuta antes del siguiente rerun, cuando los
+# selectores de la barra lateral aún no se han creado
+def ir_a_resultado(resultado):
+    st.session_state.select_proceso = int(resultado['proceso_id'])
+    st.session_state.select_subproceso = int(resultado['subproceso_id'])
+    st.session_state.select_proyecto = int(resultado['proyecto_id'])
+    st.session_state.salto_pendiente = True
+
+# Fragmento: escribir la consulta solo vuelve a ejecutar la búsqueda; saltar a un resultado
+# cambia la selección de la barra lateral y recarga la página completa
+@st.fragment
+@medir_fragmento("búsqueda")
+def seccion_busqueda():
+    if st.session_state.pop("salto_pendiente", False):
+        st.rerun()
+    consulta_busqueda = st.text_input("🔎 Buscar tareas y proyectos", key="consulta_busqueda",
+                                      placeholder="Descripción, responsable o nombre de proyecto")
+    if consulta_busqueda.strip():
+        resultados = buscar(consulta_busqueda.strip(), obtener_revision())
+        if resultados.empty:
+            st.info("ℹ️ Sin resultados.")
+        else:
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                posicion = st.selectbox(
+                    f"{len(resultados)} resultados",
+                    range(len(resultados)),
+                    format_func=lambda i: (f"{resultados.at[i, 'tipo']}: {resultados.at[i, 'texto']} "
+                                           f"({resultados.at[i, 'responsable'] or 'sin responsable'}) — "
+                                           f"{resultados.at[i, 'proceso']} › {resultados.at[i, 'subproceso']} › {resultados.at[i, 'proyecto']}"),
+                    key="resultado_busqueda"
+                )
+            with col2:
+                st.button("Ir al proyecto", key="btn_ir_resultado", on_click=ir_a_resultado,
+                          args=(resultados.loc[posicion].to_dict(),))
+
+seccion_busqueda()
+
 # ============= ÁREA PRINCIPAL - VISUALIZACIÓN =============
+instrumentacion.marcar("área principal")
 st.header("📌 Seguimiento Visual")
 
 # Mostrar información de contexto
-if st.session_state.proceso_seleccionado:
-    st.success(f"📋 **Proceso:** {st.session_state.proceso_seleccionado}")
-    if st.session_state.subproceso_seleccionado:
-        st.success(f"🔹 **Subproceso:** {st.session_state.subproceso_seleccionado}")
-        if st.session_state.proyecto_seleccionado:
-            st.success(f"🎯 **Proyecto:** {st.session_state.proyecto_seleccionado}")
-
-# Filtrar y mostrar tareas del proyecto seleccionado
-if st.session_state.proyecto_seleccionado:
-    prid = proy_df[proy_df['nombre'] == st.session_state.proyecto_seleccionado]['id'].values[0]
-    tareas_filtradas = tareas[tareas['proyecto_id'] == prid].copy()
+if st.session_state.proceso_id is not None:
+    st.success(f"📋 **Proceso:** {datos.nombre_nodo(indice, 'procesos', st.session_state.proceso_id)}")
+    if st.session_state.subproceso_id is not None:
+        st.success(f"🔹 **Subproceso:** {datos.nombre_nodo(indice, 'subprocesos', st.session_state.subproceso_id)}")
+        if st.session_state.proyecto_id is not None:
+            st.success(f"🎯 **Proyecto:** {datos.nombre_nodo(indice, 'proyectos', st.session_state.proyecto_id)}")
+
+# Guardar las ediciones de la tabla de tareas y dejar el resultado para la siguiente ejecución
+def guardar_tareas(cambios):
+    try:
+        actualizadas = datos.actualizar_tareas(engine, cambios)
+        st.session_state.guardados_tareas = st.session_state.get("guardados_tareas", 0) + 1
+        st.session_state.aviso_tareas = ("success", f"✅ {actualizadas} tareas actualizadas")
+    except Exception as e:
+        st.session_state.aviso_tareas = ("error", f"❌ Error al actualizar tareas: {e}")
+
+# Tareas del proyecto: cronograma, desviaciones, lista y edición. Es un fragmento que lee la revisión
+# en cada ejecución, así que guardar cambios en las tareas solo vuelve a ejecutar esta sección.
+@st.fragment
+@medir_fragmento("tareas")
+def seccion_tareas(proyecto_id):
+    revision = obtener_revision()
+    instantanea = obtener_instantanea()
+    tareas_filtradas = datos.filas_instantanea(instantanea, "tareas", proyecto_id)
+    
+    # Resultado del último guardado (se muestra en la ejecución siguiente al clic)
+    aviso = st.session_state.pop("aviso_tareas", None)
+    if aviso:
+        getattr(st, aviso[0])(aviso[1])
     
     if not tareas_filtradas.empty:
         # Gráfico de Gantt
+        instrumentacion.marcar("cronograma")
         st.subheader("📅 Cronograma de Tareas")
-        tareas_filtradas['fecha_inicio'] = pd.to_datetime(tareas_filtradas['fecha_inicio'])
-        tareas_filtradas['fecha_fin'] = pd.to_datetime(tareas_filtradas['fecha_fin'])
+        inicio_proyecto = tareas_filtradas['fecha_inicio'].min()
+        fin_proyecto = tareas_filtradas['fecha_fin'].max()
+        with st.expander("⚙️ Opciones del cronograma"):
+            col1, col2, col3 = st.columns(3)
+            umbral = col1.number_input("Agrupar a partir de (tareas)", min_value=1, value=UMBRAL_CRONOGRAMA,
+                                       step=50, key="umbral_cronograma")
+            agrupar_por = col2.selectbox("Agrupar por", list(AGRUPAR_CRONOGRAMA), key="agrupar_cronograma")
+            ventana = ()
+            if pd.notna(inicio_proyecto) and pd.notna(fin_proyecto):
+                ventana = col3.date_input("Ventana de fechas", value=(inicio_proyecto.date(), fin_proyecto.date()),
+                                          key=f"ventana_cronograma_{proyecto_id}")
         
-        gantt = px.timeline(
-            tareas_filtradas, 
-            x_start='fecha_inicio', 
-            x_end='fecha_fin', 
-            y='descripcion', 
-            color='estado', 
-            title="Cronograma de Tareas",
-            color_discrete_map={
-                'Pendiente': '#ff7f7f',
-                'En curso': '#ffb347', 
-                'Finalizada': '#77dd77'
-            }
-        )
-        gantt.update_yaxes(autorange='reversed')
-        gantt.update_layout(height=400)
-        st.plotly_chart(gantt, use_container_width=True)
+        agrupacion = "tarea" if len(tareas_filtradas) < umbral else AGRUPAR_CRONOGRAMA[agrupar_por]
+        desde, hasta = ventana if len(ventana) == 2 else (None, None)
+        barras, total_barras = cargar_cronograma(proyecto_id, agrupacion, desde, hasta, revision)
+        
+        if barras.empty:
+            st.info("ℹ️ No hay tareas en la ventana de fechas seleccionada.")
+        else:
+            if agrupacion != "tarea":
+                st.caption(f"Proyecto grande ({len(tareas_filtradas)} tareas): barras agrupadas por {agrupar_por.lower()} y estado.")
+            if total_barras > len(barras):
+                st.caption(f"Se muestran {len(barras)} de {total_barras} barras; acote la ventana de fechas para ver el resto.")
+            gantt = px.timeline(
+                barras, 
+                x_start='fecha_inicio', 
+                x_end='fecha_fin', 
+                y='etiqueta', 
+                color='estado', 
+                hover_data=['tareas'],
+                labels={'etiqueta': 'Tarea' if agrupacion == "tarea" else agrupar_por, 'tareas': 'Tareas'},
+                title="Cronograma de Tareas",
+                color_discrete_map={
+                    'Pendiente': '#ff7f7f',
+                    'En curso': '#ffb347', 
+                    'Finalizada': '#77dd77'
+                }
+            )
+            gantt.update_yaxes(autorange='reversed')
+            gantt.update_layout(height=min(max(400, 20 * barras['etiqueta'].nunique()), 1200))
+            st.plotly_chart(gantt, use_container_width=True)
 
         # Gráfico de desviaciones
+        instrumentacion.marcar("desviaciones")
         st.subheader("📊 Análisis de Desviaciones")
-        tareas_filtradas['fecha_proyeccion'] = pd.to_datetime(tareas_filtradas['fecha_proyeccion'])
-        tareas_filtradas['desviacion'] = (tareas_filtradas['fecha_fin'] - tareas_filtradas['fecha_proyeccion']).dt.days
 
         dev = px.bar(
             tareas_filtradas, 
@@ -390,120 +623,166 @@ if st.session_state.proyecto_seleccionado:
         dev.update_layout(height=400)
         st.plotly_chart(dev, use_container_width=True)
 
-        # Tabla de tareas
+        # Tabla de tareas (paginada en el servidor)
+        instrumentacion.marcar("lista de tareas")
         st.subheader("📋 Lista de Tareas")
-        tareas_display = tareas_filtradas[['descripcion', 'responsable', 'fecha_inicio', 'fecha_fin', 'estado']].copy()
-        tareas_display.columns = ['Descripción', 'Responsable', 'Fecha Inicio', 'Fecha Fin', 'Estado']
-        st.dataframe(tareas_display, use_container_width=True)
-
-        # Actualizar estado de tareas
-        st.subheader("✏️ Actualizar Estado de Tareas")
-        col1, col2, col3 = st.columns([2, 1, 1])
-        
-        with col1:
-            tarea_para_actualizar = st.selectbox(
-                "Seleccionar Tarea", 
-                ["Seleccionar tarea..."] + tareas_filtradas['descripcion'].tolist(),
-                key="tarea_actualizar"
-            )
+        columnas_tareas = {'descripcion': 'Descripción', 'responsable': 'Responsable', 'fecha_inicio': 'Fecha Inicio',
+                           'fecha_fin': 'Fecha Fin', 'estado': 'Estado'}
+        orden_tareas = {"Más recientes": ("fecha_creacion", True), "Más antiguas": ("fecha_creacion", False)}
+        for columna, etiqueta in columnas_tareas.items():
+            orden_tareas[f"{etiqueta} ↑"] = (columna, False)
+            orden_tareas[f"{etiqueta} ↓"] = (columna, True)
+        pagina_tareas = lista_paginada(st, "tareas", "tareas", orden_tareas, revision, proyecto_id)
         
-        with col2:
-            nuevo_estado = st.selectbox(
-                "Nuevo Estado", 
-                ["Pendiente", "En curso", "Finalizada"],
-                key="nuevo_estado"
-            )
+        # Edición en bloque de la página: los cambios se acumulan en la tabla y se guardan juntos.
+        # La clave depende solo de esta sesión (guardados propios y página: orden, proyecto y cursor),
+        # no de la revisión global: las escrituras de otras sesiones no descartan los cambios sin
+        # guardar, y tras guardar o cambiar de página el editor parte de los datos nuevos.
+        st.caption("Edite estado, responsable o fechas directamente en la tabla y pulse Guardar cambios.")
+        originales = pagina_tareas.set_index('id')[list(columnas_tareas)]
+        paginacion = st.session_state.paginacion_tareas
+        editadas = st.data_editor(
+            originales,
+            key=f"editor_tareas_{st.session_state.get('guardados_tareas', 0)}_{paginacion['firma']}_{paginacion['cursores'][-1]}",
+            disabled=['descripcion'],
+            column_config={
+                'descripcion': st.column_config.TextColumn(columnas_tareas['descripcion']),
+                'responsable': st.column_config.TextColumn(columnas_tareas['responsable']),
+                'fecha_inicio': st.column_config.DateColumn(columnas_tareas['fecha_inicio'], format="YYYY-MM-DD", required=True),
+                'fecha_fin': st.column_config.DateColumn(columnas_tareas['fecha_fin'], format="YYYY-MM-DD", required=True),
+                'estado': st.column_config.SelectboxColumn(columnas_tareas['estado'], options=list(datos.ESTADOS_TAREA), required=True),
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+        iguales = (editadas == originales) | (editadas.isna() & originales.isna())
+        cambios = editadas[~iguales.all(axis=1)].reset_index()
         
-        with col3:
-            if st.button("Actualizar Estado", key="btn_actualizar_estado"):
-                if tarea_para_actualizar != "Seleccionar tarea...":
-                    try:
-                        tid = tareas_filtradas[tareas_filtradas['descripcion'] == tarea_para_actualizar]['id'].values[0]
-                        with engine.begin() as conn:
-                            fecha_cumplimiento = datetime.now().isoformat() if nuevo_estado == "Finalizada" else None
-                            conn.execute(text("UPDATE tareas SET estado = :estado, fecha_cumplimiento = :fc WHERE id = :id"),
-                                       {"estado": nuevo_estado, "fc": fecha_cumplimiento, "id": tid})
-                        st.success(f"✅ Estado actualizado a: {nuevo_estado}")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ Error al actualizar estado: {e}")
-                else:
-                    st.warning("⚠️ Seleccione una tarea para actualizar")
+        # Se guarda en el callback del botón: la ejecución que sigue al clic (solo la del fragmento)
+        # ya lee los datos actualizados, sin una recarga adicional
+        st.button(f"💾 Guardar cambios ({len(cambios)})", key="btn_guardar_tareas", disabled=cambios.empty,
+                  on_click=guardar_tareas, args=(cambios,))
     else:
         st.info("ℹ️ No hay tareas disponibles para este proyecto.")
+
+if st.session_state.proyecto_id is not None:
+    seccion_tareas(st.session_state.proyecto_id)
 else:
     st.info("ℹ️ Seleccione un proyecto para ver sus tareas y gráficos.")
 
 # ============= RESUMEN GENERAL =============
 st.header("📊 Resumen General")
 
-if not proyectos.empty:
-    # Crear resumen con información de tareas
-    resumen_data = []
-    for _, proyecto in proyectos.iterrows():
-        tareas_proyecto = tareas[tareas['proyecto_id'] == proyecto['id']]
-        pendientes = len(tareas_proyecto[tareas_proyecto['estado'] == 'Pendiente'])
-        en_curso = len(tareas_proyecto[tareas_proyecto['estado'] == 'En curso'])
-        finalizadas = len(tareas_proyecto[tareas_proyecto['estado'] == 'Finalizada'])
-        total = pendientes + en_curso + finalizadas
-        avance = (finalizadas / total * 100) if total > 0 else 0
-        
-        # Obtener nombres de proceso y subproceso
-        proceso_nombre = procesos[procesos['id'] == proyecto['proceso_id']]['nombre'].values[0] if not procesos.empty else "N/A"
-        subproceso_nombre = subprocesos[subprocesos['id'] == proyecto['subproceso_id']]['nombre'].values[0] if not subprocesos.empty else "N/A"
-        
-        resumen_data.append({
-            'Proceso': proceso_nombre,
-            'Subproceso': subproceso_nombre,
-            'Proyecto': proyecto['nombre'],
-            'Responsable': proyecto['responsable'],
-            'Estado': proyecto['estado'],
-            'Pendientes': pendientes,
-            'En Curso': en_curso,
-            'Finalizadas': finalizadas,
-            'Total Tareas': total,
-            'Avance %': round(avance, 1)
-        })
-    
-    if resumen_data:
-        resumen_df = pd.DataFrame(resumen_data)
+# Fragmento que se refresca solo cada REFRESCO_RESUMEN: las ediciones hechas en otros fragmentos
+# aparecen sin recargar la página, y si la revisión no cambió el resumen sale de la caché
+@st.fragment(run_every=REFRESCO_RESUMEN)
+@medir_fragmento("resumen")
+def seccion_resumen():
+    resumen = cargar_resumen(obtener_revision())
+    
+    # Opcionalmente, solo los proyectos bajo la selección más concreta de la barra lateral
+    seleccion = next(((tabla, st.session_state[clave]) for tabla, clave in
+                      (("proyectos", "proyecto_id"), ("subprocesos", "subproceso_id"), ("procesos", "proceso_id"))
+                      if st.session_state[clave] is not None), None)
+    if seleccion and st.toggle("Solo la selección de la barra lateral", key="resumen_seleccion"):
+        instantanea = obtener_instantanea()
+        ids = datos.proyectos_de(instantanea["indice"], *seleccion)
+        resumen = resumen[resumen['id'].isin(ids)]
+    resumen_df = datos.construir_resumen(resumen)
+
+    if not resumen_df.empty:
         st.dataframe(resumen_df, use_container_width=True)
-        
+    
         # Gráfico de avance por proyecto
-        if len(resumen_df) > 0:
-            fig_avance = px.bar(
-                resumen_df, 
-                x='Proyecto', 
-                y='Avance %', 
-                color='Estado',
-                title="Avance por Proyecto (%)",
-                color_discrete_map={
-                    'Pendiente': '#ff7f7f',
-                    'En curso': '#ffb347', 
-                    'Finalizado': '#77dd77'
-                }
-            )
-            fig_avance.update_layout(height=400)
-            st.plotly_chart(fig_avance, use_container_width=True)
-else:
-    st.info("ℹ️ No hay proyectos disponibles.")
+        fig_avance = px.bar(
+            resumen_df, 
+            x='Proyecto', 
+            y='Avance %', 
+            color='Estado',
+            title="Avance por Proyecto (%)",
+            color_discrete_map={
+                'Pendiente': '#ff7f7f',
+                'En curso': '#ffb347', 
+                'Finalizado': '#77dd77'
+            }
+        )
+        fig_avance.update_layout(height=400)
+        st.plotly_chart(fig_avance, use_container_width=True)
+    else:
+        st.info("ℹ️ No hay proyectos disponibles.")
+
+seccion_resumen()
+
+# ============= SALUD DE LA CARTERA =============
+st.header("🩺 Salud de la Cartera")
+
+# Fragmento con el mismo refresco que el resumen: desviación, vencidas y cumplimiento a tiempo de
+# toda la cartera y por grupo, calculados en SQL (no se cargan tareas en la sesión)
+@st.fragment(run_every=REFRESCO_RESUMEN)
+@medir_fragmento("cartera")
+def seccion_cartera():
+    revision = obtener_revision()
+    hoy = datos.ahora() // 86400
+    cartera, _ = cargar_cartera("cartera", hoy, revision)
+    if cartera.empty:
+        st.info("ℹ️ No hay tareas en la cartera.")
+        return
+    
+    total = cartera.iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Tareas", int(total['tareas']))
+    col2.metric("Tareas vencidas", int(total['vencidas']))
+    col3.metric("Desviación media", "N/A" if pd.isna(total['desviacion_media']) else f"{total['desviacion_media']:.1f} días")
+    col4.metric("Finalizadas a tiempo", "N/A" if pd.isna(total['tasa_a_tiempo']) else f"{total['tasa_a_tiempo'] * 100:.1f} %")
+    
+    nivel = st.radio("Agrupar por", list(NIVELES_CARTERA), horizontal=True, key="nivel_cartera")
+    grupos, total_grupos = cargar_cartera(NIVELES_CARTERA[nivel], hoy, revision)
+    if total_grupos > len(grupos):
+        st.caption(f"Se muestran los {len(grupos)} de {total_grupos} grupos con más tareas vencidas.")
+    
+    tabla = grupos.drop(columns=['clave', 'finalizadas_medibles']).rename(columns={
+        'nombre': nivel, 'proceso': 'Proceso', 'subproceso': 'Subproceso', 'estado_proyecto': 'Estado',
+        'tareas': 'Tareas', 'desviacion_media': 'Desviación media (días)', 'desviacion_maxima': 'Desviación máxima (días)',
+        'con_retraso': 'Con retraso', 'vencidas': 'Vencidas', 'finalizadas': 'Finalizadas', 'a_tiempo': 'A tiempo',
+        'tasa_a_tiempo': 'A tiempo %', 'cuota_vencidas': '% de las vencidas',
+        'puesto_vencidas': 'Puesto (vencidas)', 'puesto_desviacion': 'Puesto (desviación)'
+    })
+    tabla['Desviación media (días)'] = tabla['Desviación media (días)'].round(1)
+    tabla[['A tiempo %', '% de las vencidas']] = (tabla[['A tiempo %', '% de las vencidas']] * 100).round(1)
+    st.dataframe(tabla, use_container_width=True, hide_index=True)
+    
+    # Los grupos con más vencidas, coloreados por desviación media
+    fig_cartera = px.bar(
+        grupos.head(20),
+        x='nombre',
+        y='vencidas',
+        color='desviacion_media',
+        color_continuous_scale='RdYlGn_r',
+        labels={'nombre': nivel, 'vencidas': 'Tareas vencidas', 'desviacion_media': 'Desviación media (días)'},
+        title=f"Tareas vencidas por {nivel.lower()} (los 20 primeros)"
+    )
+    fig_cartera.update_layout(height=400)
+    st.plotly_chart(fig_cartera, use_container_width=True)
+
+seccion_cartera()
 
 # ============= FINALIZAR PROYECTO =============
-if st.session_state.proyecto_seleccionado:
+instrumentacion.marcar("finalizar proyecto")
+if st.session_state.proyecto_id is not None:
     st.header("🏁 Finalizar Proyecto")
+    nombre_proyecto = datos.nombre_nodo(indice, 'proyectos', st.session_state.proyecto_id)
     
     col1, col2 = st.columns([1, 1])
     with col1:
-        st.info(f"Proyecto seleccionado: **{st.session_state.proyecto_seleccionado}**")
+        st.info(f"Proyecto seleccionado: **{nombre_proyecto}**")
     
     with col2:
         if st.button("✅ Finalizar Proyecto Seleccionado", key="btn_finalizar_proyecto"):
             try:
-                prid = proy_df[proy_df['nombre'] == st.session_state.proyecto_seleccionado]['id'].values[0]
                 with engine.begin() as conn:
                     conn.execute(text("UPDATE proyectos SET estado = 'Finalizado', fecha_finalizacion = :f WHERE id = :id"),
-                                 {"f": datetime.now().isoformat(), "id": prid})
-                st.success(f"🎉 Proyecto '{st.session_state.proyecto_seleccionado}' finalizado exitosamente!")
+                                 {"f": datos.ahora(), "id": st.session_state.proyecto_id})
+                st.success(f"🎉 Proyecto '{nombre_proyecto}' finalizado exitosamente!")
                 st.rerun()
             except Exception as e:
                 st.error(f"❌ Error al finalizar proyecto: {e}")
@@ -511,21 +790,86 @@ if st.session_state.proyecto_seleccionado:
 # ============= ESTADÍSTICAS ADICIONALES =============
 st.header("📈 Estadísticas Adicionales")
 
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.metric("Total Procesos", len(procesos))
+@st.fragment(run_every=REFRESCO_RESUMEN)
+@medir_fragmento("estadísticas")
+def seccion_estadisticas():
+    contadores = cargar_contadores(obtener_revision())
+    col1, col2, col3, col4 = st.columns(4)
 
-with col2:
-    st.metric("Total Subprocesos", len(subprocesos))
-
-with col3:
-    st.metric("Total Proyectos", len(proyectos))
+    with col1:
+        st.metric("Total Procesos", contadores.get("procesos", 0))
 
-with col4:
-    st.metric("Total Tareas", len(tareas))
+    with col2:
+        st.metric("Total Subprocesos", contadores.get("subprocesos", 0))
+
+    with col3:
+        st.metric("Total Proyectos", contadores.get("proyectos", 0))
+
+    with col4:
+        st.metric("Total Tareas", contadores.get("tareas", 0))
+
+seccion_estadisticas()
+
+# ============= ARCHIVO =============
+st.header("🗄️ Archivo")
+
+# Fragmento: los proyectos archivados solo se leen al activar la consulta, y buscar en ellos no
+# recarga la página. Archivar sí la recarga completa (cambian todas las secciones).
+@st.fragment
+@medir_fragmento("archivo")
+def seccion_archivo():
+    # Informe del último archivado (se muestra tras la recarga)
+    informe = st.session_state.pop("informe_archivado", None)
+    if informe:
+        st.success(f"✅ {informe['archivados']['proyectos']} proyectos y {informe['archivados']['tareas']} tareas "
+                   f"archivados en {informe['lotes']} lotes ({informe['segundos']:.1f} s). "
+                   f"Tareas activas: {informe['antes']['tareas']} → {informe['despues']['tareas']} "
+                   f"(−{informe['reduccion_tareas']:.1%}); proyectos activos: "
+                   f"{informe['antes']['proyectos']} → {informe['despues']['proyectos']}")
+    
+    with st.expander("📦 Archivar proyectos finalizados"):
+        dias = st.number_input("Finalizados hace más de (días)", min_value=0, value=archivado.DIAS_ARCHIVADO,
+                               step=30, key="dias_archivado")
+        if st.button("Archivar", key="btn_archivar"):
+            try:
+                with st.spinner("Archivando..."):
+                    st.session_state.informe_archivado = archivado.archivar(engine, dias)
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ Error al archivar: {e}")
+    
+    if not st.toggle("Consultar el archivo", key="ver_archivo"):
+        return
+    try:
+        filtro = st.text_input("Buscar proyecto archivado", key="filtro_archivo", placeholder="Nombre del proyecto")
+        revision = obtener_revision()
+        totales, proyectos_archivados = cargar_archivo(filtro.strip(), revision)
+    except Exception as e:
+        st.error(f"❌ Error al consultar el archivo: {e}")
+        return
+    
+    col1, col2 = st.columns(2)
+    col1.metric("Proyectos archivados", totales["proyectos"])
+    col2.metric("Tareas archivadas", totales["tareas"])
+    if proyectos_archivados.empty:
+        st.info("ℹ️ No hay proyectos archivados que coincidan.")
+        return
+    
+    st.dataframe(proyectos_archivados[['nombre', 'proceso', 'subproceso', 'responsable', 'fecha_finalizacion',
+                                       'fecha_archivado', 'tareas']],
+                 use_container_width=True, hide_index=True)
+    nombres = dict(zip(proyectos_archivados['id'], proyectos_archivados['nombre']))
+    proyecto_archivado = st.selectbox("Ver tareas de", list(nombres), index=None, format_func=nombres.get,
+                                      placeholder="Seleccionar proyecto archivado...", key="proyecto_archivado")
+    if proyecto_archivado is not None:
+        st.dataframe(cargar_tareas_archivadas(int(proyecto_archivado), revision)[
+                         ['descripcion', 'responsable', 'fecha_inicio', 'fecha_fin', 'estado', 'fecha_cumplimiento', 'desviacion']],
+                     use_container_width=True, hide_index=True)
+
+seccion_archivo()
 
 # Información de ayuda
+instrumentacion.marcar("ayuda")
 with st.expander("ℹ️ Información de Ayuda"):
     st.markdown("""
     ### Cómo usar este dashboard:
@@ -543,3 +887,47 @@ with st.expander("ℹ️ Información de Ayuda"):
     - 🗑️ Eliminación segura con confirmación
     - 💾 Persistencia de datos en base de datos SQLite
     """)
+
+# ============= DEPURACIÓN =============
+st.sidebar.checkbox("🛠️ Modo depuración", key="modo_depuracion",
+                    help="Mide las consultas SQL y el tiempo de cada sección en cada ejecución")
+
+if depuracion:
+    guardar_medicion(instrumentacion.terminar())
+    historial = st.session_state.mediciones
+    medicion = historial[-1]
+    
+    with st.expander("🛠️ Rendimiento de la última ejecución", expanded=True):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Tiempo total", f"{medicion['segundos'] * 1000:.0f} ms")
+        col2.metric("Consultas", medicion['consultas'])
+        col3.metric("Tiempo SQL", f"{medicion['segundos_sql'] * 1000:.0f} ms")
+        col4.metric("Filas leídas/escritas", medicion['filas'])
+        
+        st.markdown("**Secciones**")
+        st.dataframe(pd.DataFrame(medicion['secciones']), use_container_width=True, hide_index=True)
+        if medicion['detalle_consultas']:
+            st.markdown("**Consultas (más lentas primero)**")
+            st.dataframe(pd.DataFrame(medicion['detalle_consultas']).sort_values('segundos', ascending=False),
+                         use_container_width=True, hide_index=True)
+        
+        instantanea = obtener_instantanea()
+        memoria = memoria_instantanea(instantanea, instantanea["secuencia"])
+        st.markdown(f"**Instantánea compartida: {sum(memoria.values()):.1f} MiB** "
+                    f"(una por proceso, común a todas las sesiones; secuencia {instantanea['secuencia']})")
+        st.dataframe(pd.DataFrame({"tabla": list(memoria), "filas": [len(instantanea[tabla]) for tabla in memoria],
+                                   "MiB": list(memoria.values())}),
+                     use_container_width=True, hide_index=True)
+        
+        st.markdown(f"**Historial de la sesión ({len(historial)} ejecuciones)**")
+        st.dataframe(pd.DataFrame(historial)[['inicio', 'ejecucion', 'segundos', 'consultas', 'segundos_sql', 'filas']],
+                     use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Descargar mediciones (JSON lines)",
+            instrumentacion.a_jsonl(historial),
+            file_name=f"mediciones_{datetime.now():%Y%m%d_%H%M%S}.jsonl",
+            mime="application/x-ndjson",
+            key="btn_descargar_mediciones"
+        )
+        if instrumentacion.ARCHIVO_METRICAS:
+            st.caption(f"Cada medición se añade también a {instrumentacion.ARCHIVO_METRICAS}")
@@ -0,0 +1,198 @@
+# Archivado de proyectos finalizados en una base SQLite aparte (almacenamiento frío)
+#
+# Los proyectos en estado 'Finalizado' desde hace más de N días se copian con sus tareas a la base de
+# archivo, adjunta con ATTACH a una conexión de la base principal, y se borran de las tablas activas.
+# Se procesan por lotes de proyectos consecutivos para no bloquear la base durante todo el trabajo;
+# cada lote se copia y confirma en el archivo antes de borrarlo de la principal. Los triggers del
+# borrado mantienen contadores, revisión, búsqueda y registro de cambios, así que el dashboard deja de
+# leerlos sin más. El archivo guarda también los nombres de proceso y subproceso: se puede consultar
+# por sí solo aunque la jerarquía activa cambie.
+#
+# Uso (o desde gestion.py archivar):
+#   archivado.archivar(engine, dias=180)
+
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import text
+
+import datos
+
+DIAS_ARCHIVADO = int(os.environ.get("SEGUIMIENTO_DIAS_ARCHIVADO", 180))
+TAMANO_LOTE = 200
+
+ESQUEMA_ARCHIVO = (
+    """CREATE TABLE IF NOT EXISTS {esquema}.proyectos (
+        id INTEGER PRIMARY KEY,
+        nombre TEXT,
+        responsable TEXT,
+        estado TEXT,
+        proceso_id INTEGER,
+        subproceso_id INTEGER,
+        fecha_creacion INTEGER,
+        fecha_proyeccion INTEGER,
+        fecha_finalizacion INTEGER,
+        proceso TEXT,
+        subproceso TEXT,
+        fecha_archivado INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS {esquema}.tareas (
+        id INTEGER PRIMARY KEY,
+        proyecto_id INTEGER,
+        descripcion TEXT,
+        responsable TEXT,
+        fecha_inicio INTEGER,
+        fecha_fin INTEGER,
+        estado TEXT,
+        fecha_creacion INTEGER,
+        fecha_proyeccion INTEGER,
+        fecha_cumplimiento INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS {esquema}.idx_archivo_tareas_proyecto ON tareas (proyecto_id)",
+    "CREATE INDEX IF NOT EXISTS {esquema}.idx_archivo_proyectos_finalizacion ON proyectos (fecha_finalizacion)",
+)
+
+COLUMNAS_PROYECTO = ("id", "nombre", "responsable", "estado", "proceso_id", "subproceso_id",
+                     "fecha_creacion", "fecha_proyeccion", "fecha_finalizacion")
+COLUMNAS_TAREA = ("id", "proyecto_id", "descripcion", "responsable", "fecha_inicio", "fecha_fin", "estado",
+                  "fecha_creacion", "fecha_proyeccion", "fecha_cumplimiento")
+
+# Proyectos archivables: el mismo filtro elige los candidatos y acota cada lote
+FILTRO_ARCHIVABLES = "pr.estado = 'Finalizado' AND pr.fecha_finalizacion <= :corte"
+
+
+# Ruta del archivo: SEGUIMIENTO_ARCHIVO o, por defecto, junto a la base principal (<base>_archivo.db)
+def ruta_archivo(engine):
+    if os.environ.get("SEGUIMIENTO_ARCHIVO"):
+        return os.environ["SEGUIMIENTO_ARCHIVO"]
+    base, _ = os.path.splitext(engine.url.database or "seguimiento.db")
+    return f"{base}_archivo.db"
+
+
+# Engine de solo consulta sobre el archivo, con el esquema creado si aún no existe
+def abrir_archivo(ruta):
+    engine = datos.crear_engine(f"sqlite:///{ruta}")
+    with engine.begin() as conn:
+        for sql in ESQUEMA_ARCHIVO:
+            conn.execute(text(sql.format(esquema="main")))
+    return engine
+
+
+# Conexión a la base principal con el archivo adjunto como esquema "archivo". ATTACH y DETACH no
+# pueden ir dentro de una transacción, así que se ejecutan directamente en la conexión de sqlite3.
+@contextmanager
+def adjuntar(engine, ruta):
+    with engine.connect() as conn:
+        conexion = conn.connection.driver_connection
+        conexion.execute("ATTACH DATABASE ? AS archivo", (ruta,))
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conexion.execute("DETACH DATABASE archivo")
+
+
+def _tamano_activo(conn):
+    proyectos, tareas = conn.execute(text(
+        "SELECT (SELECT COUNT(*) FROM main.proyectos), (SELECT COUNT(*) FROM main.tareas)")).one()
+    return {"proyectos": proyectos, "tareas": tareas}
+
+
+# Mover al archivo los proyectos finalizados hace más de `dias` días, con sus tareas, por lotes de
+# `tamano_lote` proyectos. Devuelve un informe con lo archivado y el tamaño del conjunto activo antes
+# y después. Al terminar se compacta el registro de cambios, que recibe una entrada por fila borrada.
+def archivar(engine, dias=DIAS_ARCHIVADO, tamano_lote=TAMANO_LOTE, ruta=None):
+    ruta = ruta or ruta_archivo(engine)
+    inicio = time.perf_counter()
+    momento = datos.ahora()
+    corte = momento - dias * 86400
+    archivados = {"proyectos": 0, "tareas": 0}
+
+    with adjuntar(engine, ruta) as conn:
+        with conn.begin():
+            for sql in ESQUEMA_ARCHIVO:
+                conn.execute(text(sql.format(esquema="archivo")))
+            antes = _tamano_activo(conn)
+            candidatos = conn.execute(text(f"SELECT pr.id FROM main.proyectos pr WHERE {FILTRO_ARCHIVABLES} ORDER BY pr.id"),
+                                      {"corte": corte}).scalars().all()
+
+        lotes = [candidatos[i:i + tamano_lote] for i in range(0, len(candidatos), tamano_lote)]
+        for lote in lotes:
+            # El lote se acota por rango de ids y se vuelve a aplicar el filtro, por si algún proyecto
+            # cambió de estado desde la selección
+            params = {"corte": corte, "primero": lote[0], "ultimo": lote[-1], "momento": momento}
+            en_lote = f"pr.id BETWEEN :primero AND :ultimo AND {FILTRO_ARCHIVABLES}"
+            
+            # En WAL cada base confirma por su cuenta: una transacción que escribiera en las dos podría
+            # quedar confirmada en la principal y no en el archivo. Primero se copia y se confirma en
+            # el archivo (INSERT OR REPLACE: repetir un lote tras un fallo no choca)...
+            with conn.begin():
+                conn.execute(text(f"""
+                    INSERT OR REPLACE INTO archivo.proyectos ({', '.join(COLUMNAS_PROYECTO)}, proceso, subproceso, fecha_archivado)
+                    SELECT {', '.join(f'pr.{columna}' for columna in COLUMNAS_PROYECTO)}, pc.nombre, sp.nombre, :momento
+                    FROM main.proyectos pr
+                    LEFT JOIN main.procesos pc ON pc.id = pr.proceso_id
+                    LEFT JOIN main.subprocesos sp ON sp.id = pr.subproceso_id
+                    WHERE {en_lote}"""), params)
+                conn.execute(text(f"""
+                    INSERT OR REPLACE INTO archivo.tareas ({', '.join(COLUMNAS_TAREA)})
+                    SELECT {', '.join(f't.{columna}' for columna in COLUMNAS_TAREA)}
+                    FROM main.tareas t JOIN main.proyectos pr ON pr.id = t.proyecto_id
+                    WHERE {en_lote}"""), params)
+            
+            # ...y después se borran de la principal solo los proyectos ya presentes en el archivo con
+            # todas sus tareas (las tareas se borran en cascada)
+            archivables = f"""{en_lote}
+                AND pr.id IN (SELECT id FROM archivo.proyectos)
+                AND NOT EXISTS (SELECT 1 FROM main.tareas t WHERE t.proyecto_id = pr.id
+                                AND t.id NOT IN (SELECT id FROM archivo.tareas))"""
+            with conn.begin():
+                archivados["tareas"] += conn.execute(text(f"""
+                    SELECT COUNT(*) FROM main.tareas t JOIN main.proyectos pr ON pr.id = t.proyecto_id
+                    WHERE {archivables}"""), params).scalar_one()
+                archivados["proyectos"] += conn.execute(text(f"DELETE FROM main.proyectos AS pr WHERE {archivables}"),
+                                                        params).rowcount
+
+        with conn.begin():
+            despues = _tamano_activo(conn)
+    compactadas = datos.compactar_registro(engine)
+
+    return {
+        "archivados": archivados,
+        "lotes": len(lotes),
+        "cambios_compactados": compactadas,
+        "antes": antes,
+        "despues": despues,
+        "reduccion_tareas": 1 - despues["tareas"] / antes["tareas"] if antes["tareas"] else 0.0,
+        "segundos": time.perf_counter() - inicio,
+        "ruta": ruta,
+    }
+
+
+# ============= CONSULTA DEL ARCHIVO =============
+
+# Proyectos y tareas archivados
+def cargar_totales(engine_archivo):
+    with engine_archivo.connect() as conn:
+        proyectos, tareas = conn.execute(text(
+            "SELECT (SELECT COUNT(*) FROM proyectos), (SELECT COUNT(*) FROM tareas)")).one()
+    return {"proyectos": proyectos, "tareas": tareas}
+
+# Proyectos archivados, finalizados más recientemente primero, opcionalmente filtrados por nombre
+def cargar_proyectos(engine_archivo, texto="", limite=200):
+    proyectos = datos.tipar_fechas(pd.read_sql(text("""
+        SELECT pr.*, COUNT(t.id) AS tareas
+        FROM proyectos pr LEFT JOIN tareas t ON t.proyecto_id = pr.id
+        WHERE pr.nombre LIKE :patron
+        GROUP BY pr.id
+        ORDER BY pr.fecha_finalizacion DESC, pr.id DESC
+        LIMIT :limite"""), engine_archivo, params={"patron": f"%{texto}%", "limite": limite}))
+    proyectos["fecha_archivado"] = pd.to_datetime(proyectos["fecha_archivado"], unit="s")
+    return proyectos
+
+def cargar_tareas(engine_archivo, proyecto_id):
+    return datos.tipar_fechas(pd.read_sql(
+        text("SELECT *, fecha_fin - fecha_proyeccion AS desviacion FROM tareas WHERE proyecto_id = :id ORDER BY fecha_inicio, id"),
+        engine_archivo, params={"id": proyecto_id}))
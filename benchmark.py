@@ -0,0 +1,159 @@
+# Suite de rendimiento de las rutas de datos del dashboard
+#
+# Para cada escala (número de tareas) genera una base sintética con generador.py y mide el tiempo
+# (mediana de varias repeticiones) y el pico de memoria de Python (tracemalloc, en una pasada aparte) de:
+#   cargar_datos   las cuatro tablas completas (datos.cargar_datos)
+#   instantanea    las cuatro tablas con tipos compactos, como la instantánea compartida del dashboard
+#   resumen        Resumen General: datos.cargar_resumen + datos.construir_resumen
+#   desviaciones   tareas del proyecto más grande con su desviación, y desviación media por estado
+#   cartera        salud de la cartera en SQL: toda la cartera y cada nivel de agrupación
+#   figuras        figuras de Plotly (cronograma, desviaciones, avance) construidas y serializadas
+#
+# Uso:
+#   python benchmark.py [--escalas 1000,10000,100000] [--repeticiones 3] [--directorio DIR] [--jsonl salida.jsonl]
+#
+# Con --directorio las bases generadas se conservan y se reutilizan en ejecuciones posteriores
+# (generar 1M de tareas lleva más de un minuto); sin él se usa un directorio temporal.
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import plotly.express as px
+
+import datos
+import generador
+import instrumentacion
+
+
+def paso_cargar_datos(engine, proyecto_id):
+    return sum(len(tabla) for tabla in datos.cargar_datos(engine))
+
+
+def paso_instantanea(engine, proyecto_id):
+    instantanea = datos.cargar_instantanea(engine)
+    return sum(len(instantanea[tabla]) for tabla in datos.ENTIDADES)
+
+
+def paso_resumen(engine, proyecto_id):
+    return len(datos.construir_resumen(datos.cargar_resumen(engine)))
+
+
+def paso_desviaciones(engine, proyecto_id):
+    tareas = datos.cargar_tareas(engine, proyecto_id)
+    tareas.groupby("estado")["desviacion"].mean()
+    return len(tareas)
+
+
+def paso_cartera(engine, proyecto_id):
+    return sum(len(datos.cargar_cartera(engine, nivel)[0]) for nivel in datos.NIVELES_CARTERA)
+
+
+def paso_figuras(engine, proyecto_id):
+    barras, _ = datos.cargar_cronograma(engine, proyecto_id)
+    tareas = datos.cargar_tareas(engine, proyecto_id)
+    resumen = datos.construir_resumen(datos.cargar_resumen(engine))
+    figuras = [
+        px.timeline(barras, x_start="fecha_inicio", x_end="fecha_fin", y="etiqueta", color="estado"),
+        px.bar(tareas, x="descripcion", y="desviacion", color="estado"),
+        px.bar(resumen, x="Proyecto", y="Avance %", color="Estado"),
+    ]
+    return sum(len(figura.to_json()) for figura in figuras)
+
+
+PASOS = {
+    "cargar_datos": paso_cargar_datos,
+    "instantanea": paso_instantanea,
+    "resumen": paso_resumen,
+    "desviaciones": paso_desviaciones,
+    "cartera": paso_cartera,
+    "figuras": paso_figuras,
+}
+
+
+# Base de la escala pedida: se reutiliza si ya existe en el directorio
+def preparar_base(directorio, escala):
+    ruta = os.path.join(directorio, f"benchmark_{escala}.db")
+    existia = os.path.exists(ruta)
+    engine = datos.crear_engine(f"sqlite:///{ruta}")
+    datos.inicializar_esquema(engine)
+    if not existia:
+        inicio = time.perf_counter()
+        generador.generar(engine, escala)
+        print(f"  base de {escala} tareas generada en {time.perf_counter() - inicio:.1f} s")
+    return engine
+
+
+def proyecto_mayor(engine):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("""
+            SELECT proyecto_id FROM conteo_tareas_proyecto
+            ORDER BY pendientes + en_curso + finalizadas DESC LIMIT 1""").scalar()
+
+
+# Medir un paso: pico de memoria en una pasada con tracemalloc y mediana de tiempo sin él
+def medir(paso, engine, proyecto_id, repeticiones):
+    tracemalloc.start()
+    try:
+        unidades = paso(engine, proyecto_id)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        paso(engine, proyecto_id)
+        tiempos.append(time.perf_counter() - inicio)
+    return {"segundos": statistics.median(tiempos), "pico_mib": pico / 2**20, "unidades": unidades}
+
+
+def ejecutar(directorio, escalas, pasos, repeticiones):
+    fecha = datetime.now().isoformat(timespec="seconds")
+    resultados = []
+    for escala in escalas:
+        print(f"Escala {escala} tareas")
+        engine = preparar_base(directorio, escala)
+        proyecto_id = proyecto_mayor(engine)
+        for nombre in pasos:
+            resultado = {"fecha": fecha, "escala": escala, "paso": nombre,
+                         **medir(PASOS[nombre], engine, proyecto_id, repeticiones)}
+            print(f"  {nombre:<14} {resultado['segundos'] * 1000:>10.1f} ms   pico {resultado['pico_mib']:>8.1f} MiB")
+            resultados.append(resultado)
+        engine.dispose()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo y memoria de las rutas de datos a varias escalas")
+    parser.add_argument("--escalas", default="1000,10000,100000", help="tareas por escala, separadas por comas")
+    parser.add_argument("--pasos", default=",".join(PASOS), help="pasos a medir, separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--directorio", help="directorio donde conservar y reutilizar las bases generadas")
+    parser.add_argument("--jsonl", help="añadir los resultados a este archivo (una línea JSON por paso y escala)")
+    args = parser.parse_args(argv)
+
+    escalas = [int(escala) for escala in args.escalas.split(",")]
+    pasos = args.pasos.split(",")
+    desconocidos = [paso for paso in pasos if paso not in PASOS]
+    if desconocidos:
+        parser.error(f"pasos desconocidos: {', '.join(desconocidos)} (use {', '.join(PASOS)})")
+
+    if args.directorio:
+        os.makedirs(args.directorio, exist_ok=True)
+        resultados = ejecutar(args.directorio, escalas, pasos, args.repeticiones)
+    else:
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as directorio:
+            resultados = ejecutar(directorio, escalas, pasos, args.repeticiones)
+
+    if args.jsonl:
+        with open(args.jsonl, "a", encoding="utf-8") as archivo:
+            archivo.write(instrumentacion.a_jsonl(resultados))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1039 @@
+# Capa de acceso a datos del dashboard: esquema SQLite, contadores y consultas compartidas
+# por la aplicación Streamlit (app.py) y los comandos de mantenimiento (gestion.py)
+
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+
+URL_BD = os.environ.get("SEGUIMIENTO_DB_URL", "sqlite:///seguimiento.db")
+
+# PRAGMAs aplicados a cada conexión nueva. Cada uno se puede sobrescribir con una variable
+# de entorno SEGUIMIENTO_SQLITE_<NOMBRE> (p. ej. SEGUIMIENTO_SQLITE_BUSY_TIMEOUT=10000).
+PRAGMAS_SQLITE = {
+    "journal_mode": "WAL",       # lectores y escritor concurrentes sin bloquearse
+    "busy_timeout": 5000,        # ms de espera ante un bloqueo antes de "database is locked"
+    "synchronous": "NORMAL",     # seguro con WAL, sin fsync en cada commit
+    "mmap_size": 268435456,      # 256 MiB de lectura mapeada en memoria
+    "cache_size": -65536,        # 64 MiB de caché de páginas por conexión (negativo = KiB)
+    "foreign_keys": "ON",        # hacer efectivos los ON DELETE CASCADE
+}
+
+# Los ids obtenidos de pandas son enteros de numpy (int64, o más pequeños en la instantánea
+# compactada); sin adaptador sqlite3 los guarda como BLOB
+for _tipo in (np.int8, np.int16, np.int32, np.int64):
+    sqlite3.register_adapter(_tipo, int)
+
+# Estados de tarea y su columna en la tabla de conteos por proyecto
+ESTADOS_TAREA = {
+    'Pendiente': 'pendientes',
+    'En curso': 'en_curso',
+    'Finalizada': 'finalizadas',
+}
+
+ENTIDADES = ("procesos", "subprocesos", "proyectos", "tareas")
+TABLA_PADRE = {"subprocesos": "procesos", "proyectos": "subprocesos", "tareas": "proyectos"}
+
+# Columnas de fecha: se guardan como días (fechas) o segundos (marcas de tiempo) desde 1970-01-01
+COLUMNAS_DIAS = ("fecha_inicio", "fecha_fin", "fecha_proyeccion")
+COLUMNAS_SEGUNDOS = ("fecha_creacion", "fecha_cumplimiento", "fecha_finalizacion")
+EPOCA = datetime(1970, 1, 1)
+
+# Fecha (date, datetime o Timestamp) en días desde 1970-01-01
+def a_dias(fecha):
+    return None if pd.isna(fecha) else (pd.Timestamp(fecha).normalize() - EPOCA).days
+
+# Marca de tiempo (datetime local, sin zona) en segundos desde 1970-01-01
+def a_segundos(momento):
+    return None if momento is None else int((momento - EPOCA).total_seconds())
+
+def ahora():
+    return a_segundos(datetime.now())
+
+# Columnas de fecha leídas de la base convertidas a datetime64 (una vez, al cargar)
+def tipar_fechas(df):
+    for columnas, unidad in ((COLUMNAS_DIAS, "D"), (COLUMNAS_SEGUNDOS, "s")):
+        for columna in columnas:
+            if columna in df.columns:
+                df[columna] = pd.to_datetime(pd.to_numeric(df[columna]), unit=unidad)
+    return df
+
+# PRAGMAs efectivos: valores por defecto, variables de entorno y ajustes explícitos (en ese orden)
+def configuracion_sqlite(**ajustes):
+    pragmas = {}
+    for nombre, valor in PRAGMAS_SQLITE.items():
+        pragmas[nombre] = os.environ.get(f"SEGUIMIENTO_SQLITE_{nombre.upper()}", valor)
+    pragmas.update(ajustes)
+    return {nombre: valor for nombre, valor in pragmas.items() if valor is not None}
+
+# Crear el engine de la base de datos; pragmas=None usa configuracion_sqlite()
+def crear_engine(url=URL_BD, pragmas=None):
+    engine = create_engine(url)
+    if engine.dialect.name != "sqlite":
+        return engine
+    
+    pragmas = configuracion_sqlite() if pragmas is None else pragmas
+    
+    @event.listens_for(engine, "connect")
+    def _configurar_conexion(dbapi_connection, connection_record):
+        # pysqlite no abre transacción antes de DDL; se desactiva su manejo y BEGIN lo emite
+        # SQLAlchemy (evento "begin"), de modo que las migraciones son atómicas
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+        cursor.close()
+    
+    @event.listens_for(engine, "begin")
+    def _iniciar_transaccion(conn):
+        conn.exec_driver_sql("BEGIN")
+    
+    return engine
+
+# Crear (si no existen) las tablas base y aplicar las migraciones pendientes
+def inicializar_esquema(engine):
+    # Crear tablas con estructura corregida
+    with engine.begin() as conn:
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS procesos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT UNIQUE,
+            fecha_creacion TEXT
+        );
+        """))
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS subprocesos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT,
+            proceso_id INTEGER,
+            fecha_creacion TEXT,
+            FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE
+        );
+        """))
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS proyectos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT,
+            responsable TEXT,
+            estado TEXT DEFAULT 'Pendiente',
+            proceso_id INTEGER,
+            subproceso_id INTEGER,
+            fecha_creacion TEXT,
+            fecha_proyeccion TEXT,
+            fecha_finalizacion TEXT,
+            FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE,
+            FOREIGN KEY (subproceso_id) REFERENCES subprocesos(id) ON DELETE CASCADE
+        );
+        """))
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS tareas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            proyecto_id INTEGER,
+            descripcion TEXT,
+            responsable TEXT,
+            fecha_inicio TEXT,
+            fecha_fin TEXT,
+            estado TEXT DEFAULT 'Pendiente',
+            fecha_creacion TEXT,
+            fecha_proyeccion TEXT,
+            fecha_cumplimiento TEXT,
+            FOREIGN KEY (proyecto_id) REFERENCES proyectos(id) ON DELETE CASCADE
+        );
+        """))
+    
+    aplicar_migraciones(engine)
+
+# ============= MIGRACIONES =============
+# Cada migración recibe una conexión dentro de su propia transacción y debe ser idempotente:
+# bases creadas antes de existir el registro de versiones ya pueden tener parte del esquema.
+
+# 1: índices sobre las columnas de filtrado y ordenación habituales
+def _migracion_indices(conn):
+    for tabla in ENTIDADES:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_fecha_creacion ON {tabla} (fecha_creacion)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_subprocesos_proceso ON subprocesos (proceso_id, fecha_creacion)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_proyectos_subproceso ON proyectos (subproceso_id, fecha_creacion)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_proyectos_proceso ON proyectos (proceso_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tareas_proyecto ON tareas (proyecto_id, fecha_creacion)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tareas_estado ON tareas (estado)"))
+
+# 2: revisión de datos, contador que los triggers incrementan en cada escritura
+def _migracion_revision(conn):
+    conn.execute(text("""
+    CREATE TABLE IF NOT EXISTS revision_datos (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        valor INTEGER NOT NULL
+    );
+    """))
+    conn.execute(text("INSERT OR IGNORE INTO revision_datos (id, valor) VALUES (1, 0)"))
+    for tabla in ENTIDADES:
+        for operacion in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_{operacion.lower()}_revision
+            AFTER {operacion} ON {tabla}
+            BEGIN
+                UPDATE revision_datos SET valor = valor + 1 WHERE id = 1;
+            END;
+            """))
+
+# 3: contadores mantenidos por triggers, calculados una vez desde las tablas existentes
+def _migracion_contadores(conn):
+    _crear_contadores(conn)
+    _reconstruir_contadores(conn)
+
+# 4: ids de referencia guardados como BLOB (numpy.int64 sin adaptador) convertidos a INTEGER. Se
+# ejecuta sin claves foráneas: las bases antiguas tienen huérfanos (los borrados nunca se propagaron)
+# y un padre BLOB no coincide con ningún id, así que los huérfanos solo se distinguen después de
+# convertir; se eliminan aquí mismo para que la verificación final de claves foráneas pase.
+def _migracion_ids_blob(conn):
+    referencias = {
+        "subprocesos": ("proceso_id",),
+        "proyectos": ("proceso_id", "subproceso_id"),
+        "tareas": ("proyecto_id",),
+    }
+    for tabla, columnas in referencias.items():
+        for columna in columnas:
+            filas = conn.execute(text(f"SELECT id, {columna} FROM {tabla} WHERE typeof({columna}) = 'blob'")).all()
+            if filas:
+                conn.execute(text(f"UPDATE {tabla} SET {columna} = :valor WHERE id = :id"),
+                             [{"id": fila_id, "valor": int.from_bytes(valor, "little", signed=True)} for fila_id, valor in filas])
+    _eliminar_huerfanos(conn)
+
+# 5: limpieza única de los huérfanos que dejó la falta de claves foráneas efectivas
+def _migracion_huerfanos(conn):
+    _eliminar_huerfanos(conn)
+    _reconstruir_contadores(conn)
+
+# 6: búsqueda de texto completo (FTS5) sobre tareas y proyectos, mantenida por triggers
+def _migracion_busqueda(conn):
+    indices = {
+        "tareas_fts": ("tareas", ("descripcion", "responsable")),
+        "proyectos_fts": ("proyectos", ("nombre", "responsable")),
+    }
+    for indice, (tabla, columnas) in indices.items():
+        lista = ", ".join(columnas)
+        nuevos = ", ".join(f"NEW.{c}" for c in columnas)
+        viejos = ", ".join(f"OLD.{c}" for c in columnas)
+        conn.execute(text(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5(
+            {lista}, content='{tabla}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+        """))
+        conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabla}_insert_fts AFTER INSERT ON {tabla}
+        BEGIN
+            INSERT INTO {indice} (rowid, {lista}) VALUES (NEW.id, {nuevos});
+        END;
+        """))
+        conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabla}_delete_fts AFTER DELETE ON {tabla}
+        BEGIN
+            INSERT INTO {indice} ({indice}, rowid, {lista}) VALUES ('delete', OLD.id, {viejos});
+        END;
+        """))
+        conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabla}_update_fts AFTER UPDATE OF {lista} ON {tabla}
+        BEGIN
+            INSERT INTO {indice} ({indice}, rowid, {lista}) VALUES ('delete', OLD.id, {viejos});
+            INSERT INTO {indice} (rowid, {lista}) VALUES (NEW.id, {nuevos});
+        END;
+        """))
+        conn.execute(text(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')"))
+
+# 7: fechas como enteros (días desde 1970-01-01 para fechas, segundos para marcas de tiempo) en lugar
+# de texto ISO. SQLite no cambia el tipo de una columna: cada tabla se reconstruye (crear copia,
+# copiar convirtiendo, borrar y renombrar) y se recrean sus índices y todos los triggers.
+ESQUEMA_FECHAS_NUMERICAS = {
+    "procesos": """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT UNIQUE,
+        fecha_creacion INTEGER
+    """,
+    "subprocesos": """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        proceso_id INTEGER,
+        fecha_creacion INTEGER,
+        FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE
+    """,
+    "proyectos": """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        responsable TEXT,
+        estado TEXT DEFAULT 'Pendiente',
+        proceso_id INTEGER,
+        subproceso_id INTEGER,
+        fecha_creacion INTEGER,
+        fecha_proyeccion INTEGER,
+        fecha_finalizacion INTEGER,
+        FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE,
+        FOREIGN KEY (subproceso_id) REFERENCES subprocesos(id) ON DELETE CASCADE
+    """,
+    "tareas": """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        proyecto_id INTEGER,
+        descripcion TEXT,
+        responsable TEXT,
+        fecha_inicio INTEGER,
+        fecha_fin INTEGER,
+        estado TEXT DEFAULT 'Pendiente',
+        fecha_creacion INTEGER,
+        fecha_proyeccion INTEGER,
+        fecha_cumplimiento INTEGER,
+        FOREIGN KEY (proyecto_id) REFERENCES proyectos(id) ON DELETE CASCADE
+    """,
+}
+
+def _migracion_fechas_numericas(conn):
+    def a_dias(columna):
+        return (f"CASE WHEN typeof({columna}) = 'integer' THEN {columna} "
+                f"ELSE CAST(julianday({columna}) - 2440587.5 AS INTEGER) END")
+    
+    def a_segundos(columna):
+        return f"CASE WHEN typeof({columna}) = 'integer' THEN {columna} ELSE CAST(strftime('%s', {columna}) AS INTEGER) END"
+    
+    triggers = conn.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")).all()
+    for nombre, _ in triggers:
+        conn.execute(text(f"DROP TRIGGER {nombre}"))
+    indices = conn.execute(text("""
+        SELECT sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ('procesos', 'subprocesos', 'proyectos', 'tareas')
+    """)).scalars().all()
+    
+    for tabla, definicion in ESQUEMA_FECHAS_NUMERICAS.items():
+        columnas = [fila[1] for fila in conn.execute(text(f"PRAGMA table_info({tabla})"))]
+        seleccion = []
+        for columna in columnas:
+            if columna in COLUMNAS_DIAS:
+                seleccion.append(a_dias(columna))
+            elif columna in COLUMNAS_SEGUNDOS:
+                seleccion.append(a_segundos(columna))
+            else:
+                seleccion.append(columna)
+        secuencia = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :t"), {"t": tabla}).scalar()
+        conn.execute(text(f"CREATE TABLE {tabla}_nueva ({definicion})"))
+        conn.execute(text(f"INSERT INTO {tabla}_nueva ({', '.join(columnas)}) SELECT {', '.join(seleccion)} FROM {tabla}"))
+        conn.execute(text(f"DROP TABLE {tabla}"))
+        conn.execute(text(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}"))
+        if secuencia is not None:
+            # Conservar el último id asignado para no reutilizar ids de filas borradas
+            actualizada = conn.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :s) WHERE name = :t"),
+                                       {"s": secuencia, "t": tabla}).rowcount
+            if not actualizada:
+                conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:t, :s)"), {"s": secuencia, "t": tabla})
+    
+    for sql in indices:
+        conn.execute(text(sql))
+    for _, sql in triggers:
+        conn.execute(text(sql))
+
+# 8: registro de cambios append-only: cada escritura (también los borrados en cascada) añade la
+# entidad, el id y la operación con una secuencia creciente, para recargar solo lo que cambió
+def _migracion_registro_cambios(conn):
+    conn.execute(text("""
+    CREATE TABLE IF NOT EXISTS registro_cambios (
+        secuencia INTEGER PRIMARY KEY AUTOINCREMENT,
+        entidad TEXT NOT NULL,
+        entidad_id INTEGER NOT NULL,
+        operacion TEXT NOT NULL
+    );
+    """))
+    for tabla in ENTIDADES:
+        for operacion, fila in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            # Si un UPDATE cambia el id, el id anterior también se registra (desaparece de la tabla)
+            id_anterior = (f"INSERT INTO registro_cambios (entidad, entidad_id, operacion) "
+                           f"SELECT '{tabla}', OLD.id, 'DELETE' WHERE OLD.id != NEW.id;") if operacion == "UPDATE" else ""
+            conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_{operacion.lower()}_cambios
+            AFTER {operacion} ON {tabla}
+            BEGIN
+                INSERT INTO registro_cambios (entidad, entidad_id, operacion) VALUES ('{tabla}', {fila}.id, '{operacion}');
+                {id_anterior}
+            END;
+            """))
+
+# 9: índices (padre, columna) para cada orden de las listas paginadas (COLUMNAS_ORDEN): la página se
+# busca en el índice a partir del cursor en lugar de ordenar todas las filas del padre. Los procesos
+# ya tienen índice por fecha_creacion y por nombre (UNIQUE).
+INDICES_ORDEN = {
+    "subprocesos": ("proceso_id", ("nombre",)),
+    "proyectos": ("subproceso_id", ("nombre",)),
+    "tareas": ("proyecto_id", ("fecha_inicio", "fecha_fin", "estado", "responsable", "descripcion")),
+}
+
+def _migracion_indices_orden(conn):
+    for tabla, (padre, columnas) in INDICES_ORDEN.items():
+        for columna in columnas:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_{padre}_{columna} ON {tabla} ({padre}, {columna})"))
+
+# Migraciones en orden de versión; nunca se reordenan ni se editan una vez publicadas
+MIGRACIONES = [
+    (1, "Índices de búsqueda y ordenación", _migracion_indices),
+    (2, "Revisión de datos", _migracion_revision),
+    (3, "Contadores de tareas y totales", _migracion_contadores),
+    (4, "Ids de referencia BLOB a INTEGER", _migracion_ids_blob),
+    (5, "Eliminación de registros huérfanos", _migracion_huerfanos),
+    (6, "Búsqueda de texto completo", _migracion_busqueda),
+    (7, "Fechas como enteros", _migracion_fechas_numericas),
+    (8, "Registro de cambios", _migracion_registro_cambios),
+    (9, "Índices de las listas paginadas", _migracion_indices_orden),
+]
+
+# Migraciones que reescriben referencias o reconstruyen tablas referenciadas: se ejecutan sin claves
+# foráneas (un UPDATE sobre una base con huérfanos fallaría, y un DROP TABLE con ON DELETE CASCADE
+# activo borraría las filas hijas) y se verifican al terminar
+MIGRACIONES_SIN_CLAVES_FORANEAS = {4, 7}
+
+# Aplicar en orden las migraciones que aún no constan en schema_version
+def aplicar_migraciones(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT,
+            fecha_aplicacion TEXT
+        );
+        """))
+    
+    for version, descripcion, migracion in MIGRACIONES:
+        with engine.connect() as conn:
+            # PRAGMA foreign_keys no tiene efecto dentro de una transacción: se cambia antes de BEGIN
+            sin_claves = version in MIGRACIONES_SIN_CLAVES_FORANEAS
+            if sin_claves:
+                conn.connection.dbapi_connection.execute("PRAGMA foreign_keys = OFF")
+            try:
+                with conn.begin():
+                    aplicada = conn.execute(text("SELECT 1 FROM schema_version WHERE version = :v"), {"v": version}).first()
+                    if aplicada:
+                        continue
+                    migracion(conn)
+                    if sin_claves and conn.exec_driver_sql("PRAGMA foreign_key_check").first():
+                        raise RuntimeError(f"La migración {version} dejó referencias rotas entre tablas")
+                    conn.execute(text("INSERT OR IGNORE INTO schema_version (version, descripcion, fecha_aplicacion) VALUES (:v, :d, :f)"),
+                                 {"v": version, "d": descripcion, "f": datetime.now().isoformat()})
+            finally:
+                if sin_claves:
+                    conn.connection.dbapi_connection.execute(f"PRAGMA foreign_keys = {configuracion_sqlite().get('foreign_keys', 'ON')}")
+
+# Versión de esquema aplicada (0 si no hay migraciones registradas)
+def version_esquema(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar_one()
+
+# Contadores mantenidos por triggers: tareas por estado de cada proyecto y totales por entidad
+def _crear_contadores(conn):
+    conn.execute(text("""
+    CREATE TABLE IF NOT EXISTS conteo_tareas_proyecto (
+        proyecto_id INTEGER PRIMARY KEY,
+        pendientes INTEGER NOT NULL DEFAULT 0,
+        en_curso INTEGER NOT NULL DEFAULT 0,
+        finalizadas INTEGER NOT NULL DEFAULT 0
+    );
+    """))
+    conn.execute(text("""
+    CREATE TABLE IF NOT EXISTS contadores_globales (
+        entidad TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0
+    );
+    """))
+    for entidad in ENTIDADES:
+        conn.execute(text("INSERT OR IGNORE INTO contadores_globales (entidad, total) VALUES (:e, 0)"), {"e": entidad})
+        conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{entidad}_insert_contador
+        AFTER INSERT ON {entidad}
+        BEGIN
+            UPDATE contadores_globales SET total = total + 1 WHERE entidad = '{entidad}';
+        END;
+        """))
+        conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{entidad}_delete_contador
+        AFTER DELETE ON {entidad}
+        BEGIN
+            UPDATE contadores_globales SET total = total - 1 WHERE entidad = '{entidad}';
+        END;
+        """))
+    
+    sumar_nuevo = ", ".join(f"{col} = {col} + (NEW.estado IS '{estado}')" for estado, col in ESTADOS_TAREA.items())
+    restar_viejo = ", ".join(f"{col} = {col} - (OLD.estado IS '{estado}')" for estado, col in ESTADOS_TAREA.items())
+    conn.execute(text(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tareas_insert_conteo
+    AFTER INSERT ON tareas
+    BEGIN
+        INSERT OR IGNORE INTO conteo_tareas_proyecto (proyecto_id) VALUES (NEW.proyecto_id);
+        UPDATE conteo_tareas_proyecto SET {sumar_nuevo} WHERE proyecto_id = NEW.proyecto_id;
+    END;
+    """))
+    conn.execute(text(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tareas_update_conteo
+    AFTER UPDATE OF estado, proyecto_id ON tareas
+    BEGIN
+        UPDATE conteo_tareas_proyecto SET {restar_viejo} WHERE proyecto_id = OLD.proyecto_id;
+        INSERT OR IGNORE INTO conteo_tareas_proyecto (proyecto_id) VALUES (NEW.proyecto_id);
+        UPDATE conteo_tareas_proyecto SET {sumar_nuevo} WHERE proyecto_id = NEW.proyecto_id;
+    END;
+    """))
+    conn.execute(text(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tareas_delete_conteo
+    AFTER DELETE ON tareas
+    BEGIN
+        UPDATE conteo_tareas_proyecto SET {restar_viejo} WHERE proyecto_id = OLD.proyecto_id;
+    END;
+    """))
+    conn.execute(text("""
+    CREATE TRIGGER IF NOT EXISTS trg_proyectos_delete_conteo
+    AFTER DELETE ON proyectos
+    BEGIN
+        DELETE FROM conteo_tareas_proyecto WHERE proyecto_id = OLD.id;
+    END;
+    """))
+
+# Recalcular todos los contadores desde cero (repara cualquier desajuste)
+def reconstruir_contadores(engine):
+    with engine.begin() as conn:
+        _reconstruir_contadores(conn)
+
+def _reconstruir_contadores(conn):
+    columnas = ", ".join(ESTADOS_TAREA.values())
+    sumas = ", ".join(f"SUM(estado IS '{estado}')" for estado in ESTADOS_TAREA)
+    conn.execute(text("DELETE FROM conteo_tareas_proyecto"))
+    conn.execute(text(f"""
+        INSERT INTO conteo_tareas_proyecto (proyecto_id, {columnas})
+        SELECT proyecto_id, {sumas} FROM tareas
+        WHERE proyecto_id IN (SELECT id FROM proyectos)
+        GROUP BY proyecto_id"""))
+    for entidad in ENTIDADES:
+        conn.execute(text(f"UPDATE contadores_globales SET total = (SELECT COUNT(*) FROM {entidad}) WHERE entidad = :e"),
+                     {"e": entidad})
+    # Los contadores no tienen triggers de revisión: invalidar las cachés explícitamente
+    conn.execute(text("UPDATE revision_datos SET valor = valor + 1 WHERE id = 1"))
+
+# Eliminar subprocesos, proyectos y tareas cuyo padre ya no existe; devuelve lo eliminado por tabla
+def eliminar_huerfanos(engine):
+    with engine.begin() as conn:
+        return _eliminar_huerfanos(conn)
+
+def _eliminar_huerfanos(conn):
+    condiciones = {
+        "subprocesos": "proceso_id NOT IN (SELECT id FROM procesos)",
+        "proyectos": "proceso_id NOT IN (SELECT id FROM procesos) OR subproceso_id NOT IN (SELECT id FROM subprocesos)",
+        "tareas": "proyecto_id NOT IN (SELECT id FROM proyectos)",
+    }
+    eliminados = {}
+    for tabla, condicion in condiciones.items():
+        eliminados[tabla] = conn.execute(text(f"DELETE FROM {tabla} WHERE {condicion}")).rowcount
+    return eliminados
+
+# Obtener la revisión actual de los datos
+def obtener_revision(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT valor FROM revision_datos WHERE id = 1")).scalar_one()
+
+# Lectura completa de las cuatro tablas: la ruta de carga original, medida por benchmark.py como
+# referencia frente a la instantánea incremental
+def cargar_datos(engine):
+    return tuple(tipar_fechas(pd.read_sql(f"SELECT * FROM {entidad} ORDER BY fecha_creacion DESC, id DESC", engine))
+                 for entidad in ENTIDADES)
+
+# ============= INSTANTÁNEA INCREMENTAL =============
+# Copia en memoria de las cuatro tablas (DataFrames indexados por id) junto con la secuencia del
+# registro de cambios que refleja y su índice de la jerarquía. Para ponerla al día solo se leen las
+# filas con cambios posteriores y en el índice solo se rehacen los nodos afectados; se recarga completa
+# si el registro ya no conserva esos cambios o si afectan a gran parte de los datos.
+
+# Cambios conservados por compactar_registro y fracción de filas cambiadas a partir de la cual
+# recargar todo es más barato que parchear
+CAMBIOS_CONSERVADOS = 100000
+FRACCION_RECARGA = 0.5
+
+# Columnas de texto con pocos valores distintos (o repetidos entre sesiones), guardadas como categorías
+COLUMNAS_CATEGORICAS = ("nombre", "responsable", "estado")
+
+# Tipos compactos para la instantánea: categorías para los textos repetidos, el entero más pequeño
+# que admita cada id y float32 para la desviación en días (las fechas ya llegan como datetime64)
+def compactar_tipos(df):
+    for columna in df.columns:
+        if columna in COLUMNAS_CATEGORICAS:
+            df[columna] = df[columna].astype("category")
+        elif (columna == "id" or columna.endswith("_id")) and pd.api.types.is_integer_dtype(df[columna]):
+            df[columna] = pd.to_numeric(df[columna], downcast="integer")
+        elif columna == "desviacion":
+            df[columna] = df[columna].astype("float32")
+    return df
+
+def _leer_tabla(conn, tabla, donde="", params=None):
+    columnas = "*, fecha_fin - fecha_proyeccion AS desviacion" if tabla == "tareas" else "*"
+    df = compactar_tipos(tipar_fechas(pd.read_sql(text(f"SELECT {columnas} FROM {tabla} {donde}"), conn, params=params)))
+    return df.set_index("id", drop=False).rename_axis(None)
+
+# Unir las filas releídas a las que se conservan; las categorías se unifican antes para que las
+# columnas categóricas no pasen a object
+def _concatenar(previa, filas):
+    for columna in previa.columns:
+        if isinstance(previa[columna].dtype, pd.CategoricalDtype):
+            categorias = previa[columna].cat.categories.union(filas[columna].cat.categories)
+            previa[columna] = previa[columna].cat.set_categories(categorias)
+            filas[columna] = filas[columna].cat.set_categories(categorias)
+    return pd.concat([previa, filas])
+
+# Leer las cuatro tablas y la secuencia en una misma transacción (vista coherente en WAL)
+def cargar_instantanea(engine):
+    with engine.begin() as conn:
+        secuencia = conn.execute(text("SELECT COALESCE(MAX(secuencia), 0) FROM registro_cambios")).scalar_one()
+        instantanea = {tabla: _leer_tabla(conn, tabla) for tabla in ENTIDADES}
+    instantanea["secuencia"] = secuencia
+    instantanea["indice"] = construir_indice(instantanea)
+    return instantanea
+
+# Instantánea al día: la anterior parcheada con las filas cambiadas desde su secuencia, o una nueva
+# si no hay anterior. La anterior no se modifica.
+def actualizar_instantanea(engine, instantanea=None):
+    if instantanea is None:
+        return cargar_instantanea(engine)
+    desde = instantanea["secuencia"]
+    
+    with engine.begin() as conn:
+        secuencia, primera = conn.execute(text(
+            "SELECT COALESCE(MAX(secuencia), 0), MIN(secuencia) FROM registro_cambios")).one()
+        if secuencia == desde:
+            return instantanea
+        cambiados = conn.execute(text("""
+            SELECT entidad, COUNT(DISTINCT entidad_id) FROM registro_cambios
+            WHERE secuencia > :desde GROUP BY entidad"""), {"desde": desde}).all()
+        # Cambios ya compactados, o tantos que parchear no compensa
+        if (primera is None or primera > desde + 1
+                or sum(n for _, n in cambiados) > FRACCION_RECARGA * sum(len(instantanea[t]) for t in ENTIDADES)):
+            nueva = {tabla: _leer_tabla(conn, tabla) for tabla in ENTIDADES}
+            nueva["secuencia"] = conn.execute(text("SELECT COALESCE(MAX(secuencia), 0) FROM registro_cambios")).scalar_one()
+            nueva["indice"] = construir_indice(nueva)
+            return nueva
+        
+        nueva = dict(instantanea, secuencia=secuencia)
+        ids_cambiados = {}
+        for tabla, _ in cambiados:
+            ids = conn.execute(text("""
+                SELECT DISTINCT entidad_id FROM registro_cambios
+                WHERE entidad = :tabla AND secuencia > :desde AND secuencia <= :hasta"""),
+                {"tabla": tabla, "desde": desde, "hasta": secuencia}).scalars().all()
+            ids_cambiados[tabla] = ids
+            filas = _leer_tabla(conn, tabla, """
+                WHERE id IN (SELECT entidad_id FROM registro_cambios
+                             WHERE entidad = :tabla AND secuencia > :desde AND secuencia <= :hasta)""",
+                {"tabla": tabla, "desde": desde, "hasta": secuencia})
+            # Las filas cambiadas se sustituyen; las que ya no existen (borradas) simplemente se quitan
+            previa = instantanea[tabla].drop(index=ids, errors="ignore")
+            nueva[tabla] = _concatenar(previa, filas) if not filas.empty else previa
+    nueva["indice"] = actualizar_indice(instantanea, nueva, ids_cambiados)
+    return nueva
+
+# Memoria ocupada por cada tabla de la instantánea, en bytes (incluye textos y categorías)
+def memoria_instantanea(instantanea):
+    return {tabla: int(instantanea[tabla].memory_usage(deep=True).sum()) for tabla in ENTIDADES}
+
+# Filas de una tabla de la instantánea (las de un padre, o todos los procesos) en el orden de las
+# listas, tomadas por id con las listas de hijos de su índice de la jerarquía
+def filas_instantanea(instantanea, tabla, padre_id=None):
+    return instantanea[tabla].loc[hijos(instantanea["indice"], tabla, padre_id)].reset_index(drop=True)
+
+# ============= ÍNDICE DE LA JERARQUÍA =============
+# Guardado en cada instantánea para resolver selecciones sin recorrer los DataFrames:
+#   indice[tabla][id]              nodo de un proceso, subproceso o proyecto: id, nombre, padre_id y
+#                                  hijos (ids del nivel siguiente, más recientes primero)
+#   indice["raiz"]                 ids de los procesos, más recientes primero
+# Las tareas no tienen nodo (serían millones de diccionarios): se llega a ellas por los hijos del
+# proyecto y sus filas se leen de la instantánea por id. Al parchear una instantánea, el índice se
+# deriva del anterior: los nodos sin cambios y sus listas de hijos se comparten, no se copian.
+
+def indice_vacio():
+    sin_ids = np.empty(0, dtype=np.int64)
+    return {"raiz": sin_ids, "procesos": {}, "subprocesos": {}, "proyectos": {}, "_sin_ids": sin_ids}
+
+def _ordenar(df):
+    return df.sort_values(["fecha_creacion", "id"], ascending=False)
+
+def construir_indice(instantanea):
+    indice = indice_vacio()
+    for tabla in ENTIDADES:
+        df = _ordenar(instantanea[tabla])
+        ids = df["id"].to_numpy()
+        if tabla == "procesos":
+            indice["raiz"] = ids
+            padres = [None] * len(df)
+        else:
+            nodos_padre = indice[TABLA_PADRE[tabla]]
+            for padre_id, posiciones in df.groupby(COLUMNA_PADRE[tabla], sort=False).indices.items():
+                if padre_id in nodos_padre:
+                    nodos_padre[padre_id]["hijos"] = ids[posiciones]
+            padres = df[COLUMNA_PADRE[tabla]].tolist()
+        if tabla == "tareas":
+            continue
+        
+        nodos = indice[tabla]
+        for id_, nombre, padre_id in zip(ids.tolist(), df["nombre"].tolist(), padres):
+            nodos[id_] = {"id": id_, "nombre": nombre, "padre_id": padre_id, "hijos": indice["_sin_ids"]}
+    return indice
+
+# Índice de una instantánea parcheada a partir del de la anterior y de los ids cambiados por tabla:
+# se rehacen los nodos cambiados y, de sus padres (los de antes y los de ahora), solo las listas de
+# hijos, ordenando las filas de esos padres y no la tabla entera. El índice anterior no se modifica.
+def actualizar_indice(previa, instantanea, ids_cambiados):
+    indice = dict(previa["indice"])
+    copiados = set()
+
+    def nodos_de(tabla):
+        if tabla not in copiados:
+            indice[tabla] = dict(indice[tabla])
+            copiados.add(tabla)
+        return indice[tabla]
+
+    for tabla in ENTIDADES:
+        ids = ids_cambiados.get(tabla)
+        if not ids:
+            continue
+        df = instantanea[tabla]
+        actuales = df.loc[df.index.intersection(ids)]
+        
+        if tabla != "tareas":
+            nodos = nodos_de(tabla)
+            anteriores = {id_: nodos.pop(id_) for id_ in ids if id_ in nodos}
+            padres = [None] * len(actuales) if tabla == "procesos" else actuales[COLUMNA_PADRE[tabla]].tolist()
+            for id_, nombre, padre_id in zip(actuales["id"].tolist(), actuales["nombre"].tolist(), padres):
+                hijos_previos = anteriores[id_]["hijos"] if id_ in anteriores else indice["_sin_ids"]
+                nodos[id_] = {"id": id_, "nombre": nombre, "padre_id": padre_id, "hijos": hijos_previos}
+        
+        if tabla == "procesos":
+            indice["raiz"] = _ordenar(df)["id"].to_numpy()
+            continue
+        columna = COLUMNA_PADRE[tabla]
+        anteriores = previa[tabla]
+        afectados = (set(anteriores.loc[anteriores.index.intersection(ids), columna].tolist())
+                     | set(actuales[columna].tolist()))
+        nodos_padre = nodos_de(TABLA_PADRE[tabla])
+        afectados = [padre_id for padre_id in afectados if padre_id in nodos_padre]
+        # Hijos de los padres afectados: los que ya tenían, sin los cambiados, más los cambiados que
+        # cuelgan ahora de ellos
+        conservados = np.setdiff1d(
+            np.concatenate([indice["_sin_ids"]] + [nodos_padre[padre_id]["hijos"] for padre_id in afectados]), ids)
+        filas = _ordenar(df.loc[np.union1d(conservados, actuales.index.to_numpy())])
+        ids_filas = filas["id"].to_numpy()
+        grupos = filas.groupby(columna, sort=False).indices
+        for padre_id in afectados:
+            hijos_padre = ids_filas[grupos[padre_id]] if padre_id in grupos else indice["_sin_ids"]
+            nodos_padre[padre_id] = dict(nodos_padre[padre_id], hijos=hijos_padre)
+    return indice
+
+# Ids de `tabla` bajo un padre (todos los procesos si la tabla es procesos), más recientes primero
+def hijos(indice, tabla, padre_id=None):
+    if tabla == "procesos":
+        return indice["raiz"]
+    nodo = indice[TABLA_PADRE[tabla]].get(padre_id)
+    return indice["_sin_ids"] if nodo is None else nodo["hijos"]
+
+# Nombre de un proceso, subproceso o proyecto (None si ya no existe)
+def nombre_nodo(indice, tabla, id_):
+    nodo = indice[tabla].get(id_)
+    return None if nodo is None else nodo["nombre"]
+
+# Ids de los proyectos que cuelgan de un proceso, subproceso o proyecto, bajando por los hijos
+def proyectos_de(indice, tabla, id_):
+    ids = [id_]
+    while tabla != "proyectos":
+        tabla = ENTIDADES[ENTIDADES.index(tabla) + 1]
+        ids = [hijo for padre_id in ids for hijo in hijos(indice, tabla, padre_id).tolist()]
+    return ids
+
+# Borrar las entradas más antiguas del registro de cambios; las instantáneas más viejas que lo
+# conservado se recargan completas. Devuelve las entradas borradas.
+def compactar_registro(engine, conservar=CAMBIOS_CONSERVADOS):
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            DELETE FROM registro_cambios
+            WHERE secuencia <= (SELECT MAX(secuencia) FROM registro_cambios) - :conservar"""),
+            {"conservar": conservar}).rowcount
+
+# Tareas de un proyecto leídas directamente de la base (el dashboard las toma de la instantánea);
+# la desviación (días entre fecha_fin y fecha_proyeccion) se calcula en SQL
+def cargar_tareas(engine, proyecto_id):
+    return tipar_fechas(pd.read_sql(
+        text("""SELECT *, fecha_fin - fecha_proyeccion AS desviacion FROM tareas
+                WHERE proyecto_id = :id ORDER BY fecha_creacion DESC, id DESC"""),
+        engine, params={"id": proyecto_id}))
+
+# Aplicar en una sola transacción (un executemany) las ediciones de varias tareas: DataFrame con
+# id, estado, responsable, fecha_inicio y fecha_fin. fecha_cumplimiento se fija al pasar a Finalizada,
+# se conserva si la tarea ya lo estaba (o se fija si le faltaba) y se borra al salir de ese estado.
+# Devuelve el número de tareas actualizadas.
+def actualizar_tareas(engine, cambios):
+    invalidas = cambios[~cambios["estado"].isin(list(ESTADOS_TAREA))]
+    if not invalidas.empty:
+        raise ValueError(f"Estado no válido en {len(invalidas)} tareas (use {', '.join(ESTADOS_TAREA)})")
+    invertidas = cambios[cambios["fecha_fin"] < cambios["fecha_inicio"]]
+    if not invertidas.empty:
+        raise ValueError(f"La fecha de fin es anterior a la de inicio en {len(invertidas)} tareas")
+    
+    momento = ahora()
+    parametros = [
+        {"id": int(t.id), "estado": t.estado, "responsable": t.responsable,
+         "inicio": a_dias(t.fecha_inicio), "fin": a_dias(t.fecha_fin), "ahora": momento}
+        for t in cambios.itertuples(index=False)
+    ]
+    if not parametros:
+        return 0
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE tareas SET estado = :estado, responsable = :responsable,
+                              fecha_inicio = :inicio, fecha_fin = :fin,
+                              fecha_cumplimiento = CASE WHEN :estado != 'Finalizada' THEN NULL
+                                                        WHEN estado = 'Finalizada' THEN COALESCE(fecha_cumplimiento, :ahora)
+                                                        ELSE :ahora END
+            WHERE id = :id"""), parametros)
+    return len(parametros)
+
+# Barras del cronograma de un proyecto, calculadas en SQL para que su número no dependa del tamaño
+# del proyecto: una por tarea, o agregadas por responsable o por semana de inicio, siempre con el
+# estado. La ventana [desde, hasta] deja las tareas que se solapan con ella y limite acota las barras.
+# Devuelve (barras, total de barras sin límite).
+AGRUPACIONES_CRONOGRAMA = {
+    "tarea": ("descripcion || ' #' || id", "fecha_inicio, id"),
+    "responsable": ("COALESCE(NULLIF(responsable, ''), 'Sin responsable')", "tareas DESC, etiqueta"),
+    # El día 0 (1970-01-01) fue jueves: restando (día + 3) % 7 se llega al lunes de la semana
+    "semana": ("'Semana del ' || date((fecha_inicio - (fecha_inicio + 3) % 7) * 86400, 'unixepoch')", "etiqueta"),
+}
+MAX_BARRAS_CRONOGRAMA = 300
+
+def cargar_cronograma(engine, proyecto_id, agrupacion="tarea", desde=None, hasta=None, limite=MAX_BARRAS_CRONOGRAMA):
+    etiqueta, orden = AGRUPACIONES_CRONOGRAMA[agrupacion]
+    condiciones = ["proyecto_id = :id", "fecha_inicio IS NOT NULL", "fecha_fin IS NOT NULL"]
+    params = {"id": proyecto_id, "limite": limite}
+    if desde is not None:
+        condiciones.append("fecha_fin >= :desde")
+        params["desde"] = a_dias(desde)
+    if hasta is not None:
+        condiciones.append("fecha_inicio <= :hasta")
+        params["hasta"] = a_dias(hasta)
+
+    if agrupacion == "tarea":
+        consulta = f"""
+            SELECT {etiqueta} AS etiqueta, estado, responsable, fecha_inicio, fecha_fin, 1 AS tareas,
+                   COUNT(*) OVER () AS total
+            FROM tareas WHERE {' AND '.join(condiciones)}
+            ORDER BY {orden} LIMIT :limite"""
+    else:
+        consulta = f"""
+            SELECT {etiqueta} AS etiqueta, estado, MIN(fecha_inicio) AS fecha_inicio, MAX(fecha_fin) AS fecha_fin,
+                   COUNT(*) AS tareas, COUNT(*) OVER () AS total
+            FROM tareas WHERE {' AND '.join(condiciones)}
+            GROUP BY etiqueta, estado
+            ORDER BY {orden} LIMIT :limite"""
+    barras = pd.read_sql(text(consulta), engine, params=params)
+    total = int(barras["total"].iloc[0]) if not barras.empty else 0
+    return tipar_fechas(barras.drop(columns="total")), total
+
+# Columnas por las que se puede ordenar cada lista paginada (todas con índice, migraciones 1 y 9) y
+# columna de su padre
+COLUMNAS_ORDEN = {
+    "procesos": ("fecha_creacion", "nombre"),
+    "subprocesos": ("fecha_creacion", "nombre"),
+    "proyectos": ("fecha_creacion", "nombre"),
+    "tareas": ("fecha_creacion", "fecha_inicio", "fecha_fin", "estado", "responsable", "descripcion"),
+}
+COLUMNA_PADRE = {"subprocesos": "proceso_id", "proyectos": "subproceso_id", "tareas": "proyecto_id"}
+
+# Columnas de orden que la aplicación siempre rellena: sin tramo de NULL en la paginación
+COLUMNAS_SIN_NULOS = ("fecha_creacion",)
+
+# Tramos de una página a partir del cursor, cada uno (condición, ORDER BY) con una búsqueda por rango
+# en el índice. Los NULL van primero en orden ascendente y al final en descendente, como en ORDER BY;
+# van en un tramo aparte porque un OR con IS NULL impide buscar el cursor en el índice.
+def _tramos_pagina(orden, descendente, cursor):
+    direccion = "DESC" if descendente else "ASC"
+    completo = f"{orden} {direccion}, id {direccion}"
+    if cursor is None:
+        return [("", completo)]
+    valor, _ = cursor
+    if descendente:
+        if valor is None:
+            return [(f"{orden} IS NULL AND id < :cursor_id", "id DESC")]
+        tramos = [(f"({orden}, id) < (:cursor_valor, :cursor_id)", completo)]
+        if orden not in COLUMNAS_SIN_NULOS:
+            tramos.append((f"{orden} IS NULL", "id DESC"))
+        return tramos
+    if valor is None:
+        return [(f"{orden} IS NULL AND id > :cursor_id", "id ASC"), (f"{orden} IS NOT NULL", completo)]
+    return [(f"({orden}, id) > (:cursor_valor, :cursor_id)", completo)]
+
+# Página de una lista por keyset: filas posteriores al cursor (valor de orden, id) de la última
+# fila de la página anterior, sin OFFSET. Devuelve (página, cursor de la siguiente o None).
+def cargar_pagina(engine, tabla, orden="fecha_creacion", descendente=True, tamano=25, cursor=None, padre_id=None):
+    if orden not in COLUMNAS_ORDEN[tabla]:
+        raise ValueError(f"No se puede ordenar {tabla} por {orden}")
+    
+    condiciones = []
+    params = {}
+    if tabla in COLUMNA_PADRE:
+        condiciones.append(f"{COLUMNA_PADRE[tabla]} = :padre")
+        params["padre"] = padre_id
+    if cursor is not None:
+        params["cursor_valor"], params["cursor_id"] = cursor
+    
+    # Cada tramo solo se consulta si los anteriores no llenan la página
+    partes = []
+    faltan = tamano + 1
+    with engine.connect() as conn:
+        for condicion, orden_tramo in _tramos_pagina(orden, descendente, cursor):
+            donde = " AND ".join(condiciones + [condicion] if condicion else condiciones)
+            parte = pd.read_sql(text(f"SELECT * FROM {tabla} {'WHERE ' + donde if donde else ''} "
+                                     f"ORDER BY {orden_tramo} LIMIT :limite"),
+                                conn, params=dict(params, limite=faltan))
+            if partes and parte.empty:
+                continue
+            partes.append(parte)
+            faltan -= len(parte)
+            if faltan <= 0:
+                break
+    pagina = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+    if len(pagina) <= tamano:
+        return tipar_fechas(pagina), None
+    
+    # El cursor se toma antes de convertir las fechas: conserva el valor tal como está en la base
+    pagina = pagina.iloc[:tamano].copy()
+    ultimo = pagina.iloc[-1]
+    valor = None if pd.isna(ultimo[orden]) else ultimo[orden]
+    return tipar_fechas(pagina), (valor.item() if hasattr(valor, "item") else valor, int(ultimo["id"]))
+
+# Regenerar los índices de búsqueda desde las tablas de contenido
+def reconstruir_busqueda(engine):
+    with engine.begin() as conn:
+        for indice in ("tareas_fts", "proyectos_fts"):
+            conn.execute(text(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')"))
+
+# Convertir el texto del usuario en una consulta FTS5: cada palabra como prefijo entre comillas,
+# de modo que los operadores y signos de FTS5 no provoquen errores de sintaxis
+def consulta_fts(texto):
+    palabras = [p.replace('"', '') for p in texto.split()]
+    return " ".join(f'"{p}"*' for p in palabras if any(c.isalnum() for c in p))
+
+# Búsqueda en tareas y proyectos de toda la jerarquía, ordenada por relevancia (bm25)
+def buscar(engine, texto, limite=20):
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return pd.DataFrame(columns=["tipo", "id", "texto", "responsable", "proceso_id", "proceso",
+                                     "subproceso_id", "subproceso", "proyecto_id", "proyecto", "rango"])
+    return pd.read_sql(text("""
+        SELECT * FROM (
+            SELECT 'Tarea' AS tipo, t.id, t.descripcion AS texto, t.responsable,
+                   pc.id AS proceso_id, pc.nombre AS proceso, sp.id AS subproceso_id, sp.nombre AS subproceso,
+                   pr.id AS proyecto_id, pr.nombre AS proyecto, f.rank AS rango
+            FROM tareas_fts f
+            JOIN tareas t ON t.id = f.rowid
+            JOIN proyectos pr ON pr.id = t.proyecto_id
+            JOIN subprocesos sp ON sp.id = pr.subproceso_id
+            JOIN procesos pc ON pc.id = sp.proceso_id
+            WHERE tareas_fts MATCH :q
+            ORDER BY f.rank LIMIT :limite
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'Proyecto' AS tipo, pr.id, pr.nombre AS texto, pr.responsable,
+                   pc.id AS proceso_id, pc.nombre AS proceso, sp.id AS subproceso_id, sp.nombre AS subproceso,
+                   pr.id AS proyecto_id, pr.nombre AS proyecto, f.rank AS rango
+            FROM proyectos_fts f
+            JOIN proyectos pr ON pr.id = f.rowid
+            JOIN subprocesos sp ON sp.id = pr.subproceso_id
+            JOIN procesos pc ON pc.id = sp.proceso_id
+            WHERE proyectos_fts MATCH :q
+            ORDER BY f.rank LIMIT :limite
+        )
+        ORDER BY rango LIMIT :limite
+    """), engine, params={"q": consulta, "limite": limite})
+
+# Totales por entidad (una fila por tabla)
+def cargar_contadores(engine):
+    with engine.connect() as conn:
+        filas = conn.execute(text("SELECT entidad, total FROM contadores_globales")).all()
+    return dict(filas)
+
+# Proyectos con sus nombres de proceso/subproceso y conteos de tareas, sin leer la tabla de tareas
+def cargar_resumen(engine):
+    return pd.read_sql("""
+        SELECT pr.id, pr.nombre, pr.responsable, pr.estado,
+               pc.nombre AS proceso, sp.nombre AS subproceso,
+               COALESCE(c.pendientes, 0) AS pendientes,
+               COALESCE(c.en_curso, 0) AS en_curso,
+               COALESCE(c.finalizadas, 0) AS finalizadas
+        FROM proyectos pr
+        LEFT JOIN procesos pc ON pc.id = pr.proceso_id
+        LEFT JOIN subprocesos sp ON sp.id = pr.subproceso_id
+        LEFT JOIN conteo_tareas_proyecto c ON c.proyecto_id = pr.id
+        ORDER BY pr.fecha_creacion DESC
+    """, engine)
+
+# Columnas de presentación del Resumen General a partir de los conteos por proyecto (app.py y benchmark.py)
+def construir_resumen(resumen):
+    resumen = resumen.rename(columns={
+        'proceso': 'Proceso', 'subproceso': 'Subproceso', 'nombre': 'Proyecto',
+        'responsable': 'Responsable', 'estado': 'Estado',
+        'pendientes': 'Pendientes', 'en_curso': 'En Curso', 'finalizadas': 'Finalizadas'
+    })
+    resumen[['Proceso', 'Subproceso']] = resumen[['Proceso', 'Subproceso']].fillna("N/A")
+    resumen['Total Tareas'] = resumen['Pendientes'] + resumen['En Curso'] + resumen['Finalizadas']
+    resumen['Avance %'] = (resumen['Finalizadas'] / resumen['Total Tareas'].where(resumen['Total Tareas'] > 0) * 100).fillna(0).round(1)
+    return resumen[['Proceso', 'Subproceso', 'Proyecto', 'Responsable', 'Estado',
+                    'Pendientes', 'En Curso', 'Finalizadas', 'Total Tareas', 'Avance %']]
+
+# ============= SALUD DE LA CARTERA =============
+# Desviación, tareas vencidas y cumplimiento a tiempo agregados en SQL por nivel, sin traer tareas:
+#   desviación   días entre fecha_fin y fecha_proyeccion (positiva = retraso)
+#   vencida      tarea no finalizada cuya fecha proyectada (o de fin, si no tiene) ya pasó
+#   a tiempo     tarea finalizada con fecha_cumplimiento no posterior al día proyectado
+# Nivel -> (clave de agrupación, nombre, columnas de contexto)
+NIVELES_CARTERA = {
+    "cartera": ("0", "'Toda la cartera'", ""),
+    "proceso": ("pc.id", "pc.nombre", ""),
+    "subproceso": ("sp.id", "sp.nombre", "pc.nombre AS proceso,"),
+    "proyecto": ("pr.id", "pr.nombre", "pc.nombre AS proceso, sp.nombre AS subproceso, pr.estado AS estado_proyecto,"),
+    "responsable": ("COALESCE(NULLIF(t.responsable, ''), 'Sin responsable')",
+                    "COALESCE(NULLIF(t.responsable, ''), 'Sin responsable')", ""),
+}
+MAX_FILAS_CARTERA = 500
+
+# Indicadores por grupo del nivel pedido, los grupos con más tareas vencidas primero. Devuelve
+# (grupos, total de grupos); las funciones de ventana añaden la cuota de vencidas de cada grupo
+# sobre la cartera y su puesto por vencidas y por desviación media.
+def cargar_cartera(engine, nivel="proceso", hoy=None, limite=MAX_FILAS_CARTERA):
+    clave, nombre, contexto = NIVELES_CARTERA[nivel]
+    hoy = ahora() // 86400 if hoy is None else hoy
+    cartera = pd.read_sql(text(f"""
+        WITH grupos AS (
+            SELECT {clave} AS clave, {nombre} AS nombre, {contexto}
+                   COUNT(*) AS tareas,
+                   AVG(t.fecha_fin - t.fecha_proyeccion) AS desviacion_media,
+                   MAX(t.fecha_fin - t.fecha_proyeccion) AS desviacion_maxima,
+                   SUM(t.fecha_fin > t.fecha_proyeccion) AS con_retraso,
+                   SUM(t.estado != 'Finalizada' AND COALESCE(t.fecha_proyeccion, t.fecha_fin) < :hoy) AS vencidas,
+                   SUM(t.estado = 'Finalizada') AS finalizadas,
+                   SUM(t.estado = 'Finalizada' AND t.fecha_cumplimiento / 86400 <= t.fecha_proyeccion) AS a_tiempo,
+                   SUM(t.estado = 'Finalizada' AND t.fecha_cumplimiento IS NOT NULL
+                       AND t.fecha_proyeccion IS NOT NULL) AS finalizadas_medibles
+            FROM tareas t
+            JOIN proyectos pr ON pr.id = t.proyecto_id
+            LEFT JOIN subprocesos sp ON sp.id = pr.subproceso_id
+            LEFT JOIN procesos pc ON pc.id = pr.proceso_id
+            GROUP BY 1
+        )
+        SELECT *,
+               1.0 * a_tiempo / NULLIF(finalizadas_medibles, 0) AS tasa_a_tiempo,
+               1.0 * vencidas / NULLIF(SUM(vencidas) OVER (), 0) AS cuota_vencidas,
+               RANK() OVER (ORDER BY vencidas DESC) AS puesto_vencidas,
+               RANK() OVER (ORDER BY desviacion_media DESC) AS puesto_desviacion,
+               COUNT(*) OVER () AS total
+        FROM grupos
+        ORDER BY vencidas DESC, desviacion_media DESC, nombre
+        LIMIT :limite"""), engine, params={"hoy": hoy, "limite": limite})
+    # Con todos los valores NULL (p. ej. sin finalizadas medibles) pandas deja la columna como object
+    proporciones = ["desviacion_media", "tasa_a_tiempo", "cuota_vencidas"]
+    cartera[proporciones] = cartera[proporciones].astype(float)
+    total = int(cartera["total"].iloc[0]) if not cartera.empty else 0
+    return cartera.drop(columns="total"), total
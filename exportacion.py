@@ -0,0 +1,89 @@
+# Exportación de la jerarquía completa (proceso → subproceso → proyecto → tarea) a CSV o Parquet
+#
+# La unión se hace en SQL y el resultado se recorre por bloques con un cursor, escribiendo cada
+# bloque antes de leer el siguiente: la memoria usada no depende del tamaño de la base.
+# Las columnas coinciden con las de importacion.py, de modo que un CSV exportado se puede reimportar;
+# las fechas, guardadas como enteros, se exportan en ISO 8601.
+
+import pandas as pd
+from sqlalchemy import text
+
+TAMANO_BLOQUE = 10000
+
+FORMATOS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# Sin ORDER BY: los LEFT JOIN se recorren en orden de la tabla externa, lo que ya agrupa las filas
+# por proceso/subproceso/proyecto sin obligar a SQLite a ordenar el resultado completo
+CONSULTA_EXPORTACION = """
+    SELECT pc.id AS proceso_id, pc.nombre AS proceso,
+           sp.id AS subproceso_id, sp.nombre AS subproceso,
+           pr.id AS proyecto_id, pr.nombre AS proyecto, pr.responsable AS responsable_proyecto,
+           pr.estado AS estado_proyecto,
+           date(pr.fecha_proyeccion * 86400, 'unixepoch') AS fecha_proyeccion_proyecto,
+           datetime(pr.fecha_finalizacion, 'unixepoch') AS fecha_finalizacion,
+           t.id AS tarea_id, t.descripcion, t.responsable, t.estado,
+           date(t.fecha_inicio * 86400, 'unixepoch') AS fecha_inicio,
+           date(t.fecha_fin * 86400, 'unixepoch') AS fecha_fin,
+           date(t.fecha_proyeccion * 86400, 'unixepoch') AS fecha_proyeccion,
+           datetime(t.fecha_cumplimiento, 'unixepoch') AS fecha_cumplimiento,
+           datetime(t.fecha_creacion, 'unixepoch') AS fecha_creacion
+    FROM procesos pc
+    LEFT JOIN subprocesos sp ON sp.proceso_id = pc.id
+    LEFT JOIN proyectos pr ON pr.subproceso_id = sp.id
+    LEFT JOIN tareas t ON t.proyecto_id = pr.id
+"""
+
+COLUMNAS_ID = ["proceso_id", "subproceso_id", "proyecto_id", "tarea_id"]
+
+
+# Recorrer el resultado de la consulta en bloques de DataFrames
+def leer_bloques(engine, tamano_bloque=TAMANO_BLOQUE):
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        for bloque in pd.read_sql(text(CONSULTA_EXPORTACION), conn, chunksize=tamano_bloque):
+            # Tipos fijos en todos los bloques (un bloque sin tareas no debe cambiar el esquema)
+            bloque[COLUMNAS_ID] = bloque[COLUMNAS_ID].astype("Int64")
+            yield bloque
+
+
+# Escribir la exportación en destino (ruta o archivo binario abierto); devuelve las filas escritas
+def exportar(engine, destino, formato="csv", tamano_bloque=TAMANO_BLOQUE):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato} (use {', '.join(FORMATOS)})")
+    bloques = leer_bloques(engine, tamano_bloque)
+    if formato == "parquet":
+        return _exportar_parquet(bloques, destino)
+    return _exportar_csv(bloques, destino)
+
+
+def _exportar_csv(bloques, destino):
+    filas = 0
+    if isinstance(destino, str):
+        with open(destino, "wb") as archivo:
+            return _exportar_csv(bloques, archivo)
+    for bloque in bloques:
+        destino.write(bloque.to_csv(index=False, header=filas == 0).encode("utf-8"))
+        filas += len(bloque)
+    return filas
+
+
+def _exportar_parquet(bloques, destino):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Para exportar a Parquet instale pyarrow (pip install pyarrow)")
+
+    filas = 0
+    escritor = None
+    try:
+        for bloque in bloques:
+            if escritor is None:
+                esquema = pa.schema([pa.field(c, pa.int64() if c in COLUMNAS_ID else pa.string()) for c in bloque.columns])
+                escritor = pq.ParquetWriter(destino, esquema)
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+            filas += len(bloque)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return filas
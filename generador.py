@@ -0,0 +1,145 @@
+# Generador de datos sintéticos para reproducir volúmenes de producción en local
+#
+# Llena la base con procesos, subprocesos, proyectos y tareas con distribuciones realistas: proyectos
+# repartidos de forma desigual entre subprocesos, duraciones de tarea sesgadas (muchas cortas, pocas
+# largas), desviaciones respecto a la fecha proyectada y estados coherentes con las fechas (lo ya
+# vencido suele estar finalizado, lo futuro pendiente). Las filas se insertan por bloques con
+# executemany; los triggers mantienen contadores, revisión e índices de búsqueda como en uso normal.
+#
+# Uso:
+#   python generador.py [--db sqlite:///seguimiento.db] [--tareas 100000] [--proyectos N]
+#                       [--subprocesos N] [--procesos N] [--semilla 42]
+
+import argparse
+import time
+
+import numpy as np
+
+import datos
+
+TAMANO_BLOQUE = 50000
+
+RESPONSABLES = [
+    "Ana Gómez", "Luis Pérez", "María Torres", "Carlos Ruiz", "Lucía Martín", "Jorge Díaz",
+    "Elena Castro", "Pablo Romero", "Sofía Herrera", "Diego Navarro", "Laura Molina", "Andrés Ortiz",
+]
+ACCIONES = ["Revisar", "Preparar", "Validar", "Documentar", "Coordinar", "Implementar", "Auditar", "Actualizar"]
+OBJETOS = ["protocolo", "inventario", "informe", "agenda", "presupuesto", "procedimiento", "indicadores", "contrato"]
+
+
+# Tamaños de la jerarquía proporcionales al número de tareas (unas 15 tareas por proyecto)
+def tamanos_por_defecto(tareas):
+    proyectos = max(1, tareas // 15)
+    subprocesos = max(1, proyectos // 20)
+    procesos = max(1, subprocesos // 5)
+    return {"procesos": procesos, "subprocesos": subprocesos, "proyectos": proyectos, "tareas": tareas}
+
+
+# Insertar la jerarquía y las tareas; devuelve el número de filas creadas por tabla
+def generar(engine, tareas, proyectos=None, subprocesos=None, procesos=None, semilla=42, tamano_bloque=TAMANO_BLOQUE):
+    tamanos = tamanos_por_defecto(tareas)
+    tamanos.update({clave: valor for clave, valor in
+                    (("procesos", procesos), ("subprocesos", subprocesos), ("proyectos", proyectos)) if valor})
+    rng = np.random.default_rng(semilla)
+    ahora = datos.ahora()
+    hoy = ahora // 86400
+
+    with engine.begin() as conn:
+        # Los ids de procesos, subprocesos y proyectos se insertan explícitamente a partir del
+        # siguiente que asignaría AUTOINCREMENT, para poder referenciarlos desde el nivel inferior
+        base = _siguiente_id(conn, "procesos")
+        conn.exec_driver_sql(
+            "INSERT INTO procesos (id, nombre, fecha_creacion) VALUES (?, ?, ?)",
+            [(base + i, f"Proceso {base + i}", ahora - 86400 * 720) for i in range(tamanos["procesos"])])
+        ids_procesos = np.arange(base, base + tamanos["procesos"])
+
+        base = _siguiente_id(conn, "subprocesos")
+        padre_subproceso = rng.choice(ids_procesos, tamanos["subprocesos"])
+        conn.exec_driver_sql(
+            "INSERT INTO subprocesos (id, nombre, proceso_id, fecha_creacion) VALUES (?, ?, ?, ?)",
+            [(base + i, f"Subproceso {base + i}", int(padre), ahora - 86400 * 700)
+             for i, padre in enumerate(padre_subproceso)])
+        ids_subprocesos = np.arange(base, base + tamanos["subprocesos"])
+
+        # Unos subprocesos concentran muchos más proyectos que otros (pesos de Pareto)
+        base = _siguiente_id(conn, "proyectos")
+        n = tamanos["proyectos"]
+        pesos = rng.pareto(1.5, len(ids_subprocesos)) + 1
+        indice_subproceso = rng.choice(len(ids_subprocesos), n, p=pesos / pesos.sum())
+        creacion = ahora - rng.integers(0, 86400 * 700, n)
+        finalizado = rng.random(n) < 0.2
+        conn.exec_driver_sql("""
+            INSERT INTO proyectos (id, nombre, responsable, estado, proceso_id, subproceso_id,
+                                   fecha_creacion, fecha_proyeccion, fecha_finalizacion)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [(base + i, f"Proyecto {base + i}", RESPONSABLES[i % len(RESPONSABLES)],
+              "Finalizado" if finalizado[i] else "Pendiente",
+              int(padre_subproceso[indice_subproceso[i]]), int(ids_subprocesos[indice_subproceso[i]]),
+              int(creacion[i]), int(creacion[i] // 86400 + rng.integers(30, 365)),
+              int(creacion[i] + 86400 * rng.integers(30, 365)) if finalizado[i] else None)
+             for i in range(n)])
+        ids_proyectos = np.arange(base, base + n)
+
+        for inicio in range(0, tamanos["tareas"], tamano_bloque):
+            conn.exec_driver_sql("""
+                INSERT INTO tareas (proyecto_id, descripcion, responsable, fecha_inicio, fecha_fin, estado,
+                                    fecha_creacion, fecha_proyeccion, fecha_cumplimiento)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                _bloque_tareas(rng, ids_proyectos, inicio, min(tamano_bloque, tamanos["tareas"] - inicio), hoy))
+    return tamanos
+
+
+# Siguiente id de AUTOINCREMENT: continúa desde el último asignado (sqlite_sequence), aunque las
+# filas más recientes se hayan borrado o archivado
+def _siguiente_id(conn, tabla):
+    return conn.exec_driver_sql(f"""
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{tabla}'), 0),
+                   COALESCE((SELECT MAX(id) FROM {tabla}), 0)) + 1""").scalar()
+
+
+# Filas de un bloque de tareas, generadas de forma vectorizada
+def _bloque_tareas(rng, ids_proyectos, desplazamiento, n, hoy):
+    proyecto = rng.choice(ids_proyectos, n)
+    inicio = hoy - rng.integers(-90, 640, n)
+    duracion = np.clip(rng.lognormal(2.0, 0.8, n).astype(np.int64), 1, 180)
+    fin = inicio + duracion
+    # La fecha proyectada suele quedar antes del fin real: desviación positiva = retraso
+    proyeccion = fin - np.round(rng.normal(3, 6, n)).astype(np.int64)
+    creacion = (inicio - rng.integers(0, 30, n)) * 86400 + rng.integers(0, 86400, n)
+
+    azar = rng.random(n)
+    estado = np.where(fin < hoy, np.where(azar < 0.85, "Finalizada", "En curso"),
+                      np.where(inicio <= hoy, np.where(azar < 0.6, "En curso", "Pendiente"), "Pendiente"))
+    cumplimiento = np.where(estado == "Finalizada", (fin + rng.integers(-5, 15, n)) * 86400, -1)
+
+    accion = rng.integers(0, len(ACCIONES), n)
+    objeto = rng.integers(0, len(OBJETOS), n)
+    responsable = rng.integers(0, len(RESPONSABLES), n)
+    return [
+        (int(proyecto[i]), f"{ACCIONES[accion[i]]} {OBJETOS[objeto[i]]} {desplazamiento + i}", RESPONSABLES[responsable[i]],
+         int(inicio[i]), int(fin[i]), str(estado[i]), int(creacion[i]), int(proyeccion[i]),
+         int(cumplimiento[i]) if cumplimiento[i] >= 0 else None)
+        for i in range(n)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Llenar la base con datos sintéticos")
+    parser.add_argument("--db", default=datos.URL_BD, help="URL SQLAlchemy de la base de datos")
+    parser.add_argument("--tareas", type=int, default=100000)
+    parser.add_argument("--proyectos", type=int, help="por defecto, uno por cada 15 tareas")
+    parser.add_argument("--subprocesos", type=int, help="por defecto, uno por cada 20 proyectos")
+    parser.add_argument("--procesos", type=int, help="por defecto, uno por cada 5 subprocesos")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    engine = datos.crear_engine(args.db)
+    datos.inicializar_esquema(engine)
+    inicio = time.perf_counter()
+    creados = generar(engine, args.tareas, args.proyectos, args.subprocesos, args.procesos, args.semilla)
+    print(f"Generado en {time.perf_counter() - inicio:.1f} s: "
+          + ", ".join(f"{entidad}={total}" for entidad, total in creados.items()))
+
+
+if __name__ == "__main__":
+    main()
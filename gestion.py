@@ -0,0 +1,129 @@
+# Comandos de mantenimiento de la base de datos del dashboard
+#
+# Uso:
+#   python gestion.py [--db sqlite:///seguimiento.db] migrar
+#   python gestion.py [--db sqlite:///seguimiento.db] reconstruir-contadores
+#   python gestion.py [--db sqlite:///seguimiento.db] limpiar-huerfanos
+#   python gestion.py [--db sqlite:///seguimiento.db] reconstruir-busqueda
+#   python gestion.py [--db sqlite:///seguimiento.db] compactar-cambios [--conservar 100000]
+#   python gestion.py [--db sqlite:///seguimiento.db] archivar [--dias 180] [--lote 200] [--archivo RUTA]
+#   python gestion.py [--db sqlite:///seguimiento.db] importar ARCHIVO.csv|ARCHIVO.xlsx [--bloque 5000]
+#   python gestion.py [--db sqlite:///seguimiento.db] exportar ARCHIVO.csv|ARCHIVO.parquet [--bloque 10000]
+#
+# El registro de cambios crece con cada fila escrita. archivar e importar lo compactan al terminar;
+# las escrituras desde el dashboard no, así que compactar-cambios debe ejecutarse periódicamente
+# (por ejemplo, a diario desde cron).
+
+import argparse
+
+import archivado
+import datos
+import exportacion
+import importacion
+
+
+# Aplicar las migraciones pendientes (también se aplican al arrancar la aplicación)
+def cmd_migrar(engine, args):
+    print(f"Esquema en la versión {datos.version_esquema(engine)}")
+
+
+# Recalcular los contadores de tareas por proyecto y los totales globales
+def cmd_reconstruir_contadores(engine, args):
+    datos.reconstruir_contadores(engine)
+    contadores = datos.cargar_contadores(engine)
+    print("Contadores reconstruidos: " + ", ".join(f"{entidad}={total}" for entidad, total in contadores.items()))
+
+
+# Eliminar registros cuyo proceso, subproceso o proyecto padre ya no existe
+def cmd_limpiar_huerfanos(engine, args):
+    eliminados = datos.eliminar_huerfanos(engine)
+    print("Huérfanos eliminados: " + ", ".join(f"{tabla}={total}" for tabla, total in eliminados.items()))
+
+
+# Regenerar los índices de texto completo de tareas y proyectos
+def cmd_reconstruir_busqueda(engine, args):
+    datos.reconstruir_busqueda(engine)
+    print("Índices de búsqueda reconstruidos")
+
+
+# Borrar las entradas antiguas del registro de cambios
+def cmd_compactar_cambios(engine, args):
+    borradas = datos.compactar_registro(engine, args.conservar)
+    print(f"Entradas del registro de cambios borradas: {borradas}")
+
+
+# Mover a la base de archivo los proyectos finalizados hace más de N días, con sus tareas
+def cmd_archivar(engine, args):
+    informe = archivado.archivar(engine, args.dias, args.lote, args.archivo)
+    antes, despues = informe["antes"], informe["despues"]
+    print(f"Archivados en {informe['ruta']}: {informe['archivados']['proyectos']} proyectos y "
+          f"{informe['archivados']['tareas']} tareas en {informe['lotes']} lotes ({informe['segundos']:.1f} s)")
+    print(f"Conjunto activo: proyectos {antes['proyectos']} -> {despues['proyectos']}, "
+          f"tareas {antes['tareas']} -> {despues['tareas']} (-{informe['reduccion_tareas']:.1%})")
+    print(f"Entradas del registro de cambios borradas: {informe['cambios_compactados']}")
+
+
+# Importar procesos, proyectos y tareas desde un CSV o Excel
+def cmd_importar(engine, args):
+    informe = importacion.importar(engine, args.archivo, tamano_bloque=args.bloque)
+    creados = informe["creados"]
+    print(f"{informe['filas']} filas en {informe['segundos']:.1f} s ({informe['filas_por_segundo']:.0f} filas/s)")
+    print("Creados: " + ", ".join(f"{entidad}={total}" for entidad, total in creados.items()))
+    print(f"Rechazadas: {len(informe['rechazadas'])}")
+    print(f"Entradas del registro de cambios borradas: {informe['cambios_compactados']}")
+    for rechazada in informe["rechazadas"]:
+        print(f"  fila {rechazada['fila']}: {rechazada['motivo']}")
+
+
+# Exportar la jerarquía completa a CSV o Parquet (formato según la extensión)
+def cmd_exportar(engine, args):
+    formato = "parquet" if args.archivo.lower().endswith(".parquet") else "csv"
+    filas = exportacion.exportar(engine, args.archivo, formato, tamano_bloque=args.bloque)
+    print(f"{filas} filas exportadas a {args.archivo}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos de seguimiento")
+    parser.add_argument("--db", default=datos.URL_BD, help="URL SQLAlchemy de la base de datos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subparsers.add_parser("migrar", help="Aplicar las migraciones de esquema pendientes")
+    sub.set_defaults(func=cmd_migrar)
+
+    sub = subparsers.add_parser("reconstruir-contadores", help="Recalcular los contadores desde cero")
+    sub.set_defaults(func=cmd_reconstruir_contadores)
+
+    sub = subparsers.add_parser("limpiar-huerfanos", help="Eliminar registros sin proceso/subproceso/proyecto padre")
+    sub.set_defaults(func=cmd_limpiar_huerfanos)
+
+    sub = subparsers.add_parser("reconstruir-busqueda", help="Regenerar los índices de búsqueda de texto completo")
+    sub.set_defaults(func=cmd_reconstruir_busqueda)
+
+    sub = subparsers.add_parser("compactar-cambios", help="Borrar las entradas antiguas del registro de cambios")
+    sub.add_argument("--conservar", type=int, default=datos.CAMBIOS_CONSERVADOS, help="Entradas más recientes a conservar")
+    sub.set_defaults(func=cmd_compactar_cambios)
+
+    sub = subparsers.add_parser("archivar", help="Mover a la base de archivo los proyectos finalizados antiguos")
+    sub.add_argument("--dias", type=int, default=archivado.DIAS_ARCHIVADO, help="Días desde la finalización")
+    sub.add_argument("--lote", type=int, default=archivado.TAMANO_LOTE, help="Proyectos por transacción")
+    sub.add_argument("--archivo", help="Ruta de la base de archivo (por defecto, <base>_archivo.db)")
+    sub.set_defaults(func=cmd_archivar)
+
+    sub = subparsers.add_parser("importar", help="Importar procesos, proyectos y tareas desde CSV o Excel")
+    sub.add_argument("archivo")
+    sub.add_argument("--bloque", type=int, default=importacion.TAMANO_BLOQUE, help="Filas por transacción")
+    sub.set_defaults(func=cmd_importar)
+
+    sub = subparsers.add_parser("exportar", help="Exportar la jerarquía completa a CSV o Parquet")
+    sub.add_argument("archivo")
+    sub.add_argument("--bloque", type=int, default=exportacion.TAMANO_BLOQUE, help="Filas leídas por bloque")
+    sub.set_defaults(func=cmd_exportar)
+
+    args = parser.parse_args(argv)
+    engine = datos.crear_engine(args.db)
+    datos.inicializar_esquema(engine)
+    args.func(engine, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Importación masiva de procesos, subprocesos, proyectos y tareas desde CSV o Excel
+#
+# Cada fila describe una tarea dentro de su jerarquía (proceso → subproceso → proyecto), que se
+# resuelve por nombre y se crea si no existe. Las filas sin descripción solo crean la jerarquía.
+# El archivo se lee por bloques y cada bloque se inserta con executemany en una transacción.
+
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from datos import EPOCA, ESTADOS_TAREA, ahora, compactar_registro
+
+COLUMNAS_OBLIGATORIAS = ["proceso", "subproceso", "proyecto"]
+COLUMNAS_OPCIONALES = [
+    "responsable_proyecto", "fecha_proyeccion_proyecto",
+    "descripcion", "responsable", "estado",
+    "fecha_inicio", "fecha_fin", "fecha_proyeccion", "fecha_cumplimiento",
+]
+COLUMNAS_FECHA = ["fecha_proyeccion_proyecto", "fecha_inicio", "fecha_fin", "fecha_proyeccion", "fecha_cumplimiento"]
+
+TAMANO_BLOQUE = 5000
+
+
+# Leer el archivo en bloques de DataFrames con todas las celdas como texto
+def leer_bloques(archivo, nombre=None, tamano_bloque=TAMANO_BLOQUE):
+    nombre = (nombre or getattr(archivo, "name", None) or str(archivo)).lower()
+    if nombre.endswith((".xlsx", ".xlsm")):
+        yield from _leer_bloques_excel(archivo, tamano_bloque)
+    else:
+        yield from pd.read_csv(archivo, dtype=str, keep_default_na=False, chunksize=tamano_bloque,
+                               sep=None, engine="python", encoding="utf-8-sig")
+
+
+# Excel en modo de solo lectura: openpyxl recorre las filas sin cargar la hoja completa
+def _leer_bloques_excel(archivo, tamano_bloque):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("Para importar archivos Excel instale openpyxl (pip install openpyxl)")
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(celda or "").strip() for celda in next(filas, [])]
+        bloque = []
+        for fila in filas:
+            bloque.append(["" if celda is None else (celda.isoformat() if hasattr(celda, "isoformat") else str(celda))
+                           for celda in fila])
+            if len(bloque) == tamano_bloque:
+                yield pd.DataFrame(bloque, columns=encabezado)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=encabezado)
+    finally:
+        libro.close()
+
+
+# Normalizar encabezados y celdas; valida las filas y devuelve (bloque con fechas en días, motivos de rechazo)
+def validar_bloque(bloque):
+    bloque = bloque.rename(columns=lambda c: str(c).strip().lower().replace(" ", "_"))
+    for columna in COLUMNAS_OBLIGATORIAS + COLUMNAS_OPCIONALES:
+        if columna not in bloque.columns:
+            bloque[columna] = ""
+    bloque = bloque[COLUMNAS_OBLIGATORIAS + COLUMNAS_OPCIONALES].astype(str).apply(lambda c: c.str.strip())
+    bloque["estado"] = bloque["estado"].mask(bloque["estado"] == "", "Pendiente")
+
+    motivos = pd.Series("", index=bloque.index)
+
+    def rechazar(mascara, motivo):
+        motivos[mascara & (motivos == "")] = motivo
+
+    rechazar(bloque[COLUMNAS_OBLIGATORIAS].eq("").any(axis=1), "faltan proceso, subproceso o proyecto")
+    for columna in COLUMNAS_FECHA:
+        fechas = _parsear_fechas(bloque[columna])
+        rechazar((bloque[columna] != "") & fechas.isna(), f"{columna} no es una fecha válida")
+        bloque[columna] = (fechas.dt.normalize() - EPOCA).dt.days.astype("Int64")
+
+    tiene_tarea = bloque["descripcion"] != ""
+    rechazar(tiene_tarea & ~bloque["estado"].isin(list(ESTADOS_TAREA)),
+             "estado debe ser " + ", ".join(ESTADOS_TAREA))
+    rechazar(tiene_tarea & (bloque["fecha_inicio"].isna() | bloque["fecha_fin"].isna()),
+             "la tarea necesita fecha_inicio y fecha_fin")
+    rechazar(tiene_tarea & (bloque["fecha_fin"] < bloque["fecha_inicio"]).fillna(False), "fecha_fin anterior a fecha_inicio")
+    return bloque, motivos
+
+
+# Fechas ISO (como las guarda la aplicación o las exporta Excel) y, si no, día/mes/año
+def _parsear_fechas(columna):
+    fechas = pd.to_datetime(columna, errors="coerce", format="ISO8601")
+    pendientes = fechas.isna() & (columna != "")
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(columna[pendientes], errors="coerce", dayfirst=True, format="mixed")
+    return fechas
+
+
+# Valor de una columna de días listo para SQLite (None si falta), con un factor opcional de escala
+def _entero(valor, factor=1):
+    return None if pd.isna(valor) else int(valor) * factor
+
+
+# Ids de la jerarquía existente, por nombre dentro de su padre
+def _cargar_jerarquia(conn):
+    procesos, subprocesos, proyectos = {}, {}, {}
+    for id_, nombre in conn.execute(text("SELECT id, nombre FROM procesos ORDER BY id")):
+        procesos.setdefault(nombre, id_)
+    for id_, nombre, padre in conn.execute(text("SELECT id, nombre, proceso_id FROM subprocesos ORDER BY id")):
+        subprocesos.setdefault((padre, nombre), id_)
+    for id_, nombre, padre in conn.execute(text("SELECT id, nombre, subproceso_id FROM proyectos ORDER BY id")):
+        proyectos.setdefault((padre, nombre), id_)
+    return procesos, subprocesos, proyectos
+
+
+# Resolver (o crear) el proyecto de cada combinación proceso/subproceso/proyecto del bloque
+def _resolver_proyectos(conn, jerarquia, bloque, creados, ahora):
+    procesos, subprocesos, proyectos = jerarquia
+    ids = {}
+    primeras = bloque.drop_duplicates(COLUMNAS_OBLIGATORIAS)
+    for fila in primeras.itertuples(index=False):
+        proceso_id = procesos.get(fila.proceso)
+        if proceso_id is None:
+            proceso_id = conn.execute(text("INSERT INTO procesos (nombre, fecha_creacion) VALUES (:n, :f)"),
+                                      {"n": fila.proceso, "f": ahora}).lastrowid
+            procesos[fila.proceso] = proceso_id
+            creados["procesos"] += 1
+
+        subproceso_id = subprocesos.get((proceso_id, fila.subproceso))
+        if subproceso_id is None:
+            subproceso_id = conn.execute(text("""
+                INSERT INTO subprocesos (nombre, proceso_id, fecha_creacion) VALUES (:n, :pid, :f)"""),
+                {"n": fila.subproceso, "pid": proceso_id, "f": ahora}).lastrowid
+            subprocesos[(proceso_id, fila.subproceso)] = subproceso_id
+            creados["subprocesos"] += 1
+
+        proyecto_id = proyectos.get((subproceso_id, fila.proyecto))
+        if proyecto_id is None:
+            proyecto_id = conn.execute(text("""
+                INSERT INTO proyectos (nombre, responsable, estado, proceso_id, subproceso_id, fecha_creacion, fecha_proyeccion)
+                VALUES (:n, :r, 'Pendiente', :pid, :spid, :f, :p)"""),
+                {"n": fila.proyecto, "r": fila.responsable_proyecto, "pid": proceso_id, "spid": subproceso_id,
+                 "f": ahora, "p": _entero(fila.fecha_proyeccion_proyecto)}).lastrowid
+            proyectos[(subproceso_id, fila.proyecto)] = proyecto_id
+            creados["proyectos"] += 1
+
+        ids[(fila.proceso, fila.subproceso, fila.proyecto)] = proyecto_id
+    return ids
+
+
+# Importar un archivo completo; devuelve un informe con totales, filas rechazadas y velocidad. Al
+# terminar se compacta el registro de cambios, que recibe una entrada por cada fila importada.
+def importar(engine, archivo, nombre=None, tamano_bloque=TAMANO_BLOQUE):
+    inicio = time.perf_counter()
+    creados = {"procesos": 0, "subprocesos": 0, "proyectos": 0, "tareas": 0}
+    rechazadas = []
+    filas = 0
+
+    with engine.connect() as conn:
+        jerarquia = _cargar_jerarquia(conn)
+
+    for bloque in leer_bloques(archivo, nombre, tamano_bloque):
+        # Número de línea en el archivo (la línea 1 es el encabezado)
+        bloque.index = range(filas + 2, filas + 2 + len(bloque))
+        filas += len(bloque)
+        bloque, motivos = validar_bloque(bloque)
+        rechazadas += [{"fila": fila, "motivo": motivo} for fila, motivo in motivos[motivos != ""].items()]
+        validas = bloque[motivos == ""]
+        if validas.empty:
+            continue
+
+        creacion = ahora()
+        with engine.begin() as conn:
+            ids = _resolver_proyectos(conn, jerarquia, validas, creados, creacion)
+            tareas = validas[validas["descripcion"] != ""]
+            if tareas.empty:
+                continue
+            parametros = [
+                {"pid": ids[(t.proceso, t.subproceso, t.proyecto)], "d": t.descripcion, "r": t.responsable,
+                 "i": _entero(t.fecha_inicio), "f": _entero(t.fecha_fin), "e": t.estado, "fc": creacion,
+                 "fp": _entero(t.fecha_proyeccion), "fcu": _entero(t.fecha_cumplimiento, 86400)}
+                for t in tareas.itertuples(index=False)
+            ]
+            conn.execute(text("""
+                INSERT INTO tareas (proyecto_id, descripcion, responsable, fecha_inicio, fecha_fin, estado,
+                                    fecha_creacion, fecha_proyeccion, fecha_cumplimiento)
+                VALUES (:pid, :d, :r, :i, :f, :e, :fc, :fp, :fcu)"""), parametros)
+            creados["tareas"] += len(parametros)
+
+    compactadas = compactar_registro(engine)
+    segundos = time.perf_counter() - inicio
+    return {
+        "filas": filas,
+        "creados": creados,
+        "rechazadas": rechazadas,
+        "cambios_compactados": compactadas,
+        "segundos": segundos,
+        "filas_por_segundo": filas / segundos if segundos > 0 else 0.0,
+    }
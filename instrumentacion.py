@@ -0,0 +1,167 @@
+# Instrumentación de rendimiento: consultas SQL (número, duración y filas) y tiempo de cada sección de
+# la página, medidos por ejecución del script y exportables como JSON lines
+#
+# La medición en curso se guarda por hilo: Streamlit ejecuta cada sesión en su propio hilo, así que las
+# consultas se atribuyen a la sección activa de la sesión que las lanza. Sin medición activa los
+# eventos del engine no hacen nada.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+# Si se define, cada medición terminada se añade a este archivo (una línea JSON por ejecución)
+ARCHIVO_METRICAS = os.environ.get("SEGUIMIENTO_METRICAS")
+
+LONGITUD_SQL = 300
+
+_hilo = threading.local()
+
+
+# Registrar los eventos de consulta en el engine (una vez, al crearlo)
+def instrumentar_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+        if activa() is not None:
+            conn.info.setdefault("inicios_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues_consulta(conn, cursor, statement, parameters, context, executemany):
+        medicion = activa()
+        inicios = conn.info.get("inicios_consulta")
+        if medicion is None or not inicios:
+            return
+        consulta = {
+            "seccion": medicion["_seccion"],
+            "sql": " ".join(statement.split())[:LONGITUD_SQL],
+            "segundos": time.perf_counter() - inicios.pop(),
+            "filas": max(cursor.rowcount, 0),
+            "executemany": executemany,
+        }
+        medicion["consultas"].append(consulta)
+        # SQLite calcula las filas de un SELECT al leerlas: el cursor se envuelve para contar las
+        # filas y sumar el tiempo de lectura a la consulta
+        if cursor.description is not None and context is not None:
+            context.cursor = _CursorMedido(cursor, consulta)
+
+
+class _CursorMedido:
+    def __init__(self, cursor, consulta):
+        self._cursor = cursor
+        self._consulta = consulta
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        self._consulta["segundos"] += time.perf_counter() - inicio
+        return resultado
+
+    def fetchone(self):
+        fila = self._leer(self._cursor.fetchone)
+        self._consulta["filas"] += fila is not None
+        return fila
+
+    def fetchmany(self, *args):
+        filas = self._leer(self._cursor.fetchmany, *args)
+        self._consulta["filas"] += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._leer(self._cursor.fetchall)
+        self._consulta["filas"] += len(filas)
+        return filas
+
+
+# Medición en curso en este hilo (None si no se está midiendo)
+def activa():
+    return getattr(_hilo, "medicion", None)
+
+
+# Empezar a medir una ejecución; las consultas se atribuyen a `seccion` hasta el siguiente marcar()
+def iniciar(ejecucion, seccion=None):
+    ahora = time.perf_counter()
+    _hilo.medicion = {
+        "ejecucion": ejecucion,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "consultas": [],
+        "_tramos": [],
+        "_seccion": seccion or ejecucion,
+        "_inicio": ahora,
+        "_inicio_seccion": ahora,
+    }
+
+
+# Cerrar la sección en curso y abrir otra
+def marcar(seccion):
+    medicion = activa()
+    if medicion is None:
+        return
+    ahora = time.perf_counter()
+    medicion["_tramos"].append((medicion["_seccion"], ahora - medicion["_inicio_seccion"]))
+    medicion["_seccion"] = seccion
+    medicion["_inicio_seccion"] = ahora
+
+
+# Medir un bloque como sección propia y volver después a la sección anterior
+@contextmanager
+def seccion(nombre):
+    medicion = activa()
+    anterior = medicion["_seccion"] if medicion else None
+    marcar(nombre)
+    try:
+        yield
+    finally:
+        if anterior is not None:
+            marcar(anterior)
+
+
+# Terminar la medición del hilo y devolverla resumida por sección (None si no había ninguna)
+def terminar():
+    medicion = activa()
+    if medicion is None:
+        return None
+    marcar(None)
+    _hilo.medicion = None
+
+    secciones = {}
+    for nombre, segundos in medicion["_tramos"]:
+        if nombre is not None:
+            secciones.setdefault(nombre, {"seccion": nombre, "segundos": 0.0, "consultas": 0,
+                                          "segundos_sql": 0.0, "filas": 0})["segundos"] += segundos
+    for consulta in medicion["consultas"]:
+        resumen = secciones.setdefault(consulta["seccion"], {"seccion": consulta["seccion"], "segundos": 0.0,
+                                                             "consultas": 0, "segundos_sql": 0.0, "filas": 0})
+        resumen["consultas"] += 1
+        resumen["segundos_sql"] += consulta["segundos"]
+        resumen["filas"] += consulta["filas"]
+
+    consultas = medicion["consultas"]
+    return {
+        "ejecucion": medicion["ejecucion"],
+        "inicio": medicion["inicio"],
+        "segundos": time.perf_counter() - medicion["_inicio"],
+        "consultas": len(consultas),
+        "segundos_sql": sum(consulta["segundos"] for consulta in consultas),
+        "filas": sum(consulta["filas"] for consulta in consultas),
+        "secciones": list(secciones.values()),
+        "detalle_consultas": consultas,
+    }
+
+
+# Mediciones en formato JSON lines (una por línea)
+def a_jsonl(mediciones):
+    return "".join(json.dumps(medicion, ensure_ascii=False) + "\n" for medicion in mediciones)
+
+
+# Añadir una medición al archivo de métricas, si está configurado
+def guardar(medicion, ruta=ARCHIVO_METRICAS):
+    if ruta and medicion is not None:
+        with open(ruta, "a", encoding="utf-8") as archivo:
+            archivo.write(a_jsonl([medicion]))
@@ -0,0 +1,122 @@
+# Prueba de carga multi-hilo de la base de datos del dashboard
+#
+# Simula varias sesiones concurrentes (hilos lectores que consultan los contadores y las tareas
+# de un proyecto, e hilos escritores que crean y actualizan tareas) sobre una base temporal, y
+# compara la conexión sin ajustes con los PRAGMAs de datos.PRAGMAS_SQLITE.
+#
+# Uso:
+#   python prueba_carga.py [--lectores 8] [--escritores 2] [--segundos 10] [--proyectos 200] [--tareas 20000]
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import datos
+
+ESTADOS = list(datos.ESTADOS_TAREA)
+
+
+# Crear una base de prueba con un proceso, un subproceso y los proyectos/tareas pedidos
+def poblar(engine, n_proyectos, n_tareas):
+    ahora = datos.ahora()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO procesos (nombre, fecha_creacion) VALUES ('Carga', :f)"), {"f": ahora})
+        conn.execute(text("INSERT INTO subprocesos (nombre, proceso_id, fecha_creacion) VALUES ('Carga', 1, :f)"), {"f": ahora})
+        conn.execute(text("""
+            INSERT INTO proyectos (nombre, responsable, estado, proceso_id, subproceso_id, fecha_creacion)
+            VALUES (:n, 'Carga', 'Pendiente', 1, 1, :f)"""),
+            [{"n": f"Proyecto {i}", "f": ahora} for i in range(n_proyectos)])
+        conn.execute(text("""
+            INSERT INTO tareas (proyecto_id, descripcion, responsable, estado, fecha_creacion)
+            VALUES (:p, :d, 'Carga', :e, :f)"""),
+            [{"p": i % n_proyectos + 1, "d": f"Tarea {i}", "e": random.choice(ESTADOS), "f": ahora}
+             for i in range(n_tareas)])
+
+
+# Operación de lectura típica de un rerun
+def leer(engine, n_proyectos):
+    datos.cargar_contadores(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT * FROM tareas WHERE proyecto_id = :p ORDER BY fecha_creacion DESC"),
+                     {"p": random.randint(1, n_proyectos)}).all()
+
+
+# Operación de escritura típica: crear una tarea o cambiar el estado de una existente
+def escribir(engine, n_proyectos, n_tareas):
+    with engine.begin() as conn:
+        if random.random() < 0.5:
+            conn.execute(text("""
+                INSERT INTO tareas (proyecto_id, descripcion, responsable, estado, fecha_creacion)
+                VALUES (:p, 'Nueva', 'Carga', 'Pendiente', :f)"""),
+                {"p": random.randint(1, n_proyectos), "f": datos.ahora()})
+        else:
+            conn.execute(text("UPDATE tareas SET estado = :e WHERE id = :id"),
+                         {"e": random.choice(ESTADOS), "id": random.randint(1, n_tareas)})
+
+
+# Ejecutar un escenario y devolver operaciones y errores por tipo
+def ejecutar_escenario(nombre, pragmas, args):
+    with tempfile.TemporaryDirectory(prefix="prueba_carga_") as directorio:
+        engine = datos.crear_engine(f"sqlite:///{os.path.join(directorio, 'carga.db')}", pragmas=pragmas)
+        datos.inicializar_esquema(engine)
+        poblar(engine, args.proyectos, args.tareas)
+        resultados = _medir(engine, args)
+        engine.dispose()
+
+    print(f"{nombre:<12} lecturas/s={resultados['lecturas'] / args.segundos:>9.1f}  "
+          f"escrituras/s={resultados['escrituras'] / args.segundos:>8.1f}  "
+          f"errores lectura={resultados['errores_lectura']}  escritura={resultados['errores_escritura']}")
+    return resultados
+
+
+# Lanzar lectores y escritores durante args.segundos y contar sus operaciones
+def _medir(engine, args):
+    resultados = {"lecturas": 0, "escrituras": 0, "errores_lectura": 0, "errores_escritura": 0}
+    bloqueo = threading.Lock()
+    fin = time.perf_counter() + args.segundos
+
+    def trabajador(tipo):
+        while time.perf_counter() < fin:
+            try:
+                if tipo == "lecturas":
+                    leer(engine, args.proyectos)
+                else:
+                    escribir(engine, args.proyectos, args.tareas)
+                clave = tipo
+            except OperationalError:
+                clave = "errores_lectura" if tipo == "lecturas" else "errores_escritura"
+            with bloqueo:
+                resultados[clave] += 1
+
+    hilos = [threading.Thread(target=trabajador, args=("lecturas",)) for _ in range(args.lectores)]
+    hilos += [threading.Thread(target=trabajador, args=("escrituras",)) for _ in range(args.escritores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente sobre SQLite")
+    parser.add_argument("--lectores", type=int, default=8)
+    parser.add_argument("--escritores", type=int, default=2)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--proyectos", type=int, default=200)
+    parser.add_argument("--tareas", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    print(f"{args.lectores} lectores, {args.escritores} escritores, {args.segundos:g} s, "
+          f"{args.proyectos} proyectos, {args.tareas} tareas")
+    ejecutar_escenario("sin ajustes", {}, args)
+    ejecutar_escenario("ajustado", datos.configuracion_sqlite(), args)
+
+
+if __name__ == "__main__":
+    main()
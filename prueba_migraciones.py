@@ -0,0 +1,108 @@
+# Prueba de actualización de una base con el esquema original
+#
+# Crea una base como las que dejaba la primera versión del dashboard (fechas en texto, ids de
+# referencia guardados como BLOB de numpy.int64 y huérfanos porque las claves foráneas no estaban
+# activas: se borra un proceso sin propagar el borrado), aplica datos.inicializar_esquema y comprueba
+# que llega a la última versión sin referencias rotas, con los ids como enteros y sin perder las
+# filas válidas. Termina con código 1 si alguna comprobación falla.
+#
+# Uso:
+#   python prueba_migraciones.py
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+import numpy as np
+from sqlalchemy import text
+
+import datos
+
+ESQUEMA_ORIGINAL = """
+    CREATE TABLE procesos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT UNIQUE, fecha_creacion TEXT);
+    CREATE TABLE subprocesos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT, proceso_id INTEGER, fecha_creacion TEXT,
+        FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE);
+    CREATE TABLE proyectos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT, responsable TEXT, estado TEXT DEFAULT 'Pendiente',
+        proceso_id INTEGER, subproceso_id INTEGER, fecha_creacion TEXT, fecha_proyeccion TEXT, fecha_finalizacion TEXT,
+        FOREIGN KEY (proceso_id) REFERENCES procesos(id) ON DELETE CASCADE,
+        FOREIGN KEY (subproceso_id) REFERENCES subprocesos(id) ON DELETE CASCADE);
+    CREATE TABLE tareas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, proyecto_id INTEGER, descripcion TEXT, responsable TEXT,
+        fecha_inicio TEXT, fecha_fin TEXT, estado TEXT DEFAULT 'Pendiente', fecha_creacion TEXT,
+        fecha_proyeccion TEXT, fecha_cumplimiento TEXT,
+        FOREIGN KEY (proyecto_id) REFERENCES proyectos(id) ON DELETE CASCADE);
+"""
+
+
+# id guardado como lo hacía la versión original: numpy.int64 sin adaptador, es decir, BLOB
+def _blob(id_):
+    return np.int64(id_).tobytes()
+
+
+# Base original con dos procesos (cada uno con un subproceso, un proyecto y dos tareas) en la que
+# se borra el segundo proceso sin cascada. Devuelve las filas que deben sobrevivir por tabla.
+def crear_base_original(ruta):
+    conexion = sqlite3.connect(ruta)
+    conexion.executescript(ESQUEMA_ORIGINAL)
+    for i in (1, 2):
+        conexion.execute("INSERT INTO procesos (id, nombre, fecha_creacion) VALUES (?, ?, '2024-01-01 10:00:00')",
+                         (i, f"Proceso {i}"))
+        conexion.execute("INSERT INTO subprocesos (id, nombre, proceso_id, fecha_creacion) VALUES (?, ?, ?, '2024-01-02 10:00:00')",
+                         (i, f"Subproceso {i}", _blob(i)))
+        conexion.execute("""
+            INSERT INTO proyectos (id, nombre, responsable, proceso_id, subproceso_id, fecha_creacion, fecha_proyeccion)
+            VALUES (?, ?, 'Ana', ?, ?, '2024-01-03 10:00:00', '2024-03-01')""", (i, f"Proyecto {i}", _blob(i), _blob(i)))
+        for j in (1, 2):
+            conexion.execute("""
+                INSERT INTO tareas (proyecto_id, descripcion, responsable, fecha_inicio, fecha_fin, estado,
+                                    fecha_creacion, fecha_proyeccion)
+                VALUES (?, ?, 'Ana', '2024-01-10', '2024-01-20', 'Pendiente', '2024-01-04 10:00:00', '2024-01-18')""",
+                (_blob(i), f"Tarea {i}.{j}"))
+    conexion.execute("DELETE FROM procesos WHERE id = 2")
+    conexion.commit()
+    conexion.close()
+    return {"procesos": 1, "subprocesos": 1, "proyectos": 1, "tareas": 2}
+
+
+def comprobar(ruta, esperadas):
+    errores = []
+    engine = datos.crear_engine(f"sqlite:///{ruta}")
+    datos.inicializar_esquema(engine)
+
+    version = datos.version_esquema(engine)
+    if version != datos.MIGRACIONES[-1][0]:
+        errores.append(f"versión de esquema {version}, se esperaba {datos.MIGRACIONES[-1][0]}")
+    with engine.connect() as conn:
+        rotas = conn.exec_driver_sql("PRAGMA foreign_key_check").all()
+        if rotas:
+            errores.append(f"referencias rotas: {rotas}")
+        for tabla, columna in (("subprocesos", "proceso_id"), ("proyectos", "subproceso_id"), ("tareas", "proyecto_id")):
+            blobs = conn.execute(text(f"SELECT COUNT(*) FROM {tabla} WHERE typeof({columna}) != 'integer'")).scalar()
+            if blobs:
+                errores.append(f"{tabla}.{columna}: {blobs} ids sin convertir")
+        for tabla, total in esperadas.items():
+            filas = conn.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
+            if filas != total:
+                errores.append(f"{tabla}: {filas} filas, se esperaban {total}")
+    if datos.cargar_contadores(engine).get("tareas") != esperadas["tareas"]:
+        errores.append(f"contadores incorrectos: {datos.cargar_contadores(engine)}")
+    engine.dispose()
+    return errores
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="prueba_migraciones_") as directorio:
+        ruta = os.path.join(directorio, "original.db")
+        errores = comprobar(ruta, crear_base_original(ruta))
+    for error in errores:
+        print(f"ERROR: {error}")
+    print("Migración de una base original: " + ("FALLA" if errores else "correcta"))
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()